@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import argparse
+import random
+import statistics
+import time
+
+import cairo
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk
+
+from gtkdm import widgets
+
+# (big_endian, offset) of the eight Byte widgets which together show all bits of a 64-bit value
+BYTES = [(False, 0), (False, 1), (False, 2), (True, 4), (True, 3), (True, 2), (True, 1), (True, 0)]
+
+
+def pump():
+    while Gtk.events_pending():
+        Gtk.main_iteration()
+
+
+def draw_paths(cr, leds, size):
+    """Draw LEDs by rasterizing their paths, as Byte and Indicator did before the sprite atlas"""
+    cr.set_line_width(widgets.LEDSprites.line_width)
+    for x, y, color in leds:
+        cr.rectangle(x, y, size, size)
+        cr.set_source_rgba(*color)
+        cr.fill_preserve()
+        cr.set_source_rgba(0, 0, 0, 1)
+        cr.stroke()
+
+
+def draw_sprites(cr, leds, size):
+    for x, y, spec in leds:
+        widgets.LEDSprites.blit(cr, widgets.LEDSprites.get(size, spec, '#000000'), x, y, size)
+
+
+def compare_drawing(count=6400, size=10, repeat=20):
+    """
+    Compare drawing LEDs from the sprite atlas with rasterizing their paths
+    :param count: number of LEDs per frame
+    :param size: LED size
+    :param repeat: number of frames
+    :return: dictionary mapping methods to average frame times in seconds
+    """
+    palette = widgets.ColorSequence('AG')
+    columns = 64
+    step = size + 5
+    positions = [(widgets.pix(4 + (i % columns) * step), widgets.pix(4 + (i // columns) * step)) for i in range(count)]
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 8 + columns * step, 8 + (count // columns + 1) * step)
+    methods = [
+        ('Paths', draw_paths, [tuple(palette(0)), tuple(palette(1))]),
+        ('Sprites', draw_sprites, [palette.spec(0), palette.spec(1)]),
+    ]
+    results = {}
+    for name, method, colors in methods:
+        cr = cairo.Context(surface)
+        start = time.perf_counter()
+        for i in range(repeat):
+            leds = [(x, y, colors[random.getrandbits(1)]) for x, y in positions]
+            method(cr, leds, size)
+        surface.flush()
+        results[name] = (time.perf_counter() - start) / repeat
+    return results
+
+
+def build_display(rows, size):
+    window = Gtk.Window(title='Byte Benchmark')
+    grid = Gtk.Grid(column_spacing=2, row_spacing=2)
+    table = []
+    for row in range(rows):
+        for column, (big_endian, offset) in enumerate(BYTES):
+            byte = widgets.Byte(count=8, offset=offset, big_endian=big_endian, size=size, columns=8)
+            byte.set_size_request(8 * (size + 5) + 8, size + 8)
+            grid.attach(byte, column, row, 1, 1)
+            table.append((row, byte))
+    window.add(grid)
+    window.show_all()
+    pump()
+    return window, table
+
+
+def run_display(rows=16, rate=50.0, duration=5.0, size=10):
+    """
+    Update a display of 64-bit multi-Byte rows with random values at a fixed rate and measure how long each update
+    takes to process and draw
+    :param rows: number of 64-bit rows of eight Byte widgets
+    :param rate: update rate in Hz
+    :param duration: duration in seconds
+    :param size: LED size
+    :return: list of update times in seconds
+    """
+    window, table = build_display(rows, size)
+    times = []
+    period = 1.0 / rate
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        values = [random.getrandbits(64) for i in range(rows)]
+        for row, byte in table:
+            byte.on_change(None, values[row])
+        window.get_window().process_updates(True)
+        pump()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        time.sleep(max(0.0, period - elapsed))
+    window.destroy()
+    return times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark redrawing displays of many Byte widgets')
+    parser.add_argument('-r', '--rows', type=int, default=16, help='Number of 64-bit rows of Byte widgets')
+    parser.add_argument('-f', '--rate', type=float, default=50, help='Update rate in Hz')
+    parser.add_argument('-t', '--duration', type=float, default=5, help='Duration in seconds')
+    parser.add_argument('-s', '--size', type=int, default=10, help='LED size')
+    args = parser.parse_args()
+
+    leds = args.rows * 64
+    times = compare_drawing(count=leds, size=args.size)
+    print('{} LEDs per frame: paths {:0.2f} ms, sprites {:0.2f} ms, speed-up {:0.1f}x'.format(
+        leds, times['Paths'] * 1000, times['Sprites'] * 1000, times['Paths'] / times['Sprites']
+    ))
+
+    times = run_display(rows=args.rows, rate=args.rate, duration=args.duration, size=args.size)
+    print('{} Byte widgets at {:g} Hz: {} updates, mean {:0.2f} ms, max {:0.2f} ms, {:0.0f}% of the period'.format(
+        args.rows * len(BYTES), args.rate, len(times), statistics.mean(times) * 1000, max(times) * 1000,
+        100 * statistics.mean(times) * args.rate
+    ))
+    print('Sprites in atlas: {}'.format(len(widgets.LEDSprites.registry)))
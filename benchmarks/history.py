@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+
+import numpy
+
+from gtkdm import utils
+
+
+class ShiftBuffer(object):
+    """History which shifts the whole window on every sample, as StripData and ChartPair did before RingBuffer"""
+
+    def __init__(self, size, columns):
+        self.data = numpy.full((size, columns), numpy.nan)
+
+    def append(self, row):
+        self.data[:-1] = self.data[1:]
+        self.data[-1] = row
+
+
+def time_appends(history, samples, count):
+    """
+    Return the average time in seconds needed to append one sample
+    """
+    start = time.perf_counter()
+    for row in samples[:count]:
+        history.append(row)
+    return (time.perf_counter() - start) / count
+
+
+def time_views(history, repeat=100):
+    """
+    Return the average time in seconds needed to get the ordered views of a history for drawing
+    """
+    start = time.perf_counter()
+    for i in range(repeat):
+        if isinstance(history, utils.HistoryPyramid):
+            level = history.levels[history.select(2000)]
+            level.segments()
+        else:
+            history.segments()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(sizes, channels=5, count=10000, shift_count=200):
+    """
+    Measure the cost of one sample for growing history windows
+    :param sizes: window sizes in samples
+    :param channels: number of channels per sample
+    :param count: number of samples to append to the ring buffer and the pyramid
+    :param shift_count: number of samples to append to the shifted window, which is much slower
+    :return: list of (size, {method: (append time, view time)}) tuples
+    """
+    results = []
+    samples = numpy.random.normal(size=(max(count, shift_count), channels))
+    for size in sizes:
+        ring = utils.RingBuffer(size, channels)
+        pyramid = utils.HistoryPyramid(size, channels)
+        # start from a full window, as in a long-running display
+        ring.extend(numpy.random.normal(size=(size, channels)))
+        pyramid.extend(numpy.random.normal(size=(size, channels)))
+        results.append((size, {
+            'Shift': (time_appends(ShiftBuffer(size, channels), samples, shift_count), 0.0),
+            'RingBuffer': (time_appends(ring, samples, count), time_views(ring)),
+            'HistoryPyramid': (time_appends(pyramid, samples, count), time_views(pyramid)),
+        }))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark strip chart and scatter plot histories')
+    parser.add_argument('-c', '--channels', type=int, default=5, help='Number of channels')
+    parser.add_argument('-n', '--count', type=int, default=10000, help='Number of samples appended per window')
+    parser.add_argument('sizes', metavar='sizes', type=int, nargs='*', default=[10**5, 3 * 10**5, 10**6],
+                        help='Window sizes in samples')
+    args = parser.parse_args()
+
+    for size, times in run(args.sizes, channels=args.channels, count=args.count):
+        print('{:>9} samples: {}'.format(size, ', '.join(
+            '{} {:0.2f} us/sample'.format(name, append * 1e6) + (' {:0.1f} us/view'.format(view * 1e6) if view else '')
+            for name, (append, view) in times.items()
+        )))
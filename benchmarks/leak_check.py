@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import os
+import sys
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk
+
+from gtkdm import widgets
+
+
+def pump():
+    """Process all pending events, including queued signal emissions and idle callbacks"""
+    while Gtk.events_pending():
+        Gtk.main_iteration()
+
+
+def rss():
+    """Return the resident set size of the process in bytes"""
+    with open('/proc/self/statm') as handle:
+        return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def counts():
+    return {
+        'channels': widgets.Channels.stats()['channels'],
+        'owners': widgets.Channels.stats()['owners'],
+        'timers': len(widgets.Clock.subscribers),
+        'styles': widgets.StyleBatch.stats()['pending'],
+    }
+
+
+def cycle(path, macros):
+    window = widgets.Manager.show_display(path, macros, multiple=True)
+    if window is None:
+        raise SystemExit('Display File {} not found'.format(path))
+    pump()
+    window.destroy()
+    pump()
+    gc.collect()
+
+
+def check(path, macros, repeat=1000, warmup=20, growth=8):
+    """
+    Open and destroy a display repeatedly and verify that channels, timers and memory are released
+    :param path: display file path
+    :param macros: macro specification
+    :param repeat: number of open/destroy cycles
+    :param warmup: number of cycles before the baseline memory is sampled
+    :param growth: maximum allowed growth of the resident set size in MB after the warm-up
+    :return: list of failure messages
+    """
+    for i in range(warmup):
+        cycle(path, macros)
+    baseline = counts()  # shared resources created lazily by the first display stay alive
+    start = rss()
+    failures = []
+    for i in range(repeat):
+        cycle(path, macros)
+        current = counts()
+        for name, value in current.items():
+            if value > baseline[name]:
+                failures.append('cycle {}: {} {} > {}'.format(i, value, name, baseline[name]))
+        if failures:
+            break
+
+    grown = (rss() - start) / 2**20
+    print('{} cycles: {:0.1f} MB resident growth, {}'.format(
+        repeat, grown, ', '.join('{} {}'.format(v, k) for k, v in counts().items())
+    ))
+    if grown > growth:
+        failures.append('resident memory grew by {:0.1f} MB'.format(grown))
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that closing Gtk DM displays releases their resources')
+    parser.add_argument('-n', '--repeat', type=int, default=1000, help='Number of open/close cycles')
+    parser.add_argument('-g', '--growth', type=float, default=8, help='Allowed resident memory growth in MB')
+    parser.add_argument('-m', '--macros', type=str, default='', help='Macros', required=False)
+    parser.add_argument('display', metavar='display', type=str, help='Display File Name')
+    args = parser.parse_args()
+
+    widgets.EDITOR = False
+    problems = check(args.display, args.macros, repeat=args.repeat, growth=args.growth)
+    for problem in problems:
+        print('LEAK: {}'.format(problem))
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GLib
+
+from gtkdm import widgets
+
+
+class Feeder(object):
+    """
+    Post messages to a MessageLog at a fixed average rate, the way its channel monitor would, and record the
+    intervals between the frames of its window
+    """
+
+    def __init__(self, log, rate, duration):
+        self.log = log
+        self.rate = rate
+        self.duration = duration
+        self.sent = 0
+        self.frames = []
+        self.start = 0.0
+
+    def run(self):
+        self.start = time.perf_counter()
+        self.log.add_tick_callback(self.on_frame)
+        GLib.timeout_add(1, self.on_timeout)
+        Gtk.main()
+
+    def on_timeout(self):
+        elapsed = time.perf_counter() - self.start
+        due = int(min(elapsed, self.duration) * self.rate)
+        while self.sent < due:
+            self.sent += 1
+            self.log.on_change(None, 'Sequencer step {} completed'.format(self.sent))
+            self.log.on_time(None, datetime.now())
+        if elapsed >= self.duration:
+            GLib.timeout_add(500, Gtk.main_quit)  # let the last batch be flushed
+            return False
+        return True
+
+    def on_frame(self, widget, clock):
+        self.frames.append(time.perf_counter())
+        return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark a MessageLog receiving messages at a high rate')
+    parser.add_argument('-f', '--rate', type=float, default=1000, help='Message rate in Hz')
+    parser.add_argument('-t', '--duration', type=float, default=10, help='Duration in seconds')
+    parser.add_argument('-b', '--buffer', type=int, default=5000, help='Buffer size in messages')
+    parser.add_argument('-v', '--virtual', action='store_true', help='Use the virtual message list')
+    args = parser.parse_args()
+
+    window = Gtk.Window(title='MessageLog Benchmark')
+    window.set_default_size(600, 400)
+    log = widgets.MessageLog(buffer_size=args.buffer, virtual=args.virtual)
+    window.add(log)
+    window.show_all()
+
+    feeder = Feeder(log, args.rate, args.duration)
+    feeder.run()
+
+    intervals = [b - a for a, b in zip(feeder.frames, feeder.frames[1:])] or [0.0]
+    kept = len(log.list.model) if log.list else log.buffer.get_line_count() - 1
+    print('{} messages in {:g} s, {} kept (buffer {})'.format(feeder.sent, args.duration, kept, args.buffer))
+    print('{} frames: mean interval {:0.1f} ms, max interval {:0.1f} ms'.format(
+        len(feeder.frames), statistics.mean(intervals) * 1000, max(intervals) * 1000
+    ))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+import tracemalloc
+
+import cairo
+import numpy
+
+from gtkdm import widgets, utils
+
+WIDTH, HEIGHT = 800, 300
+
+
+def make_trace(count):
+    """Return x and y values of a noisy random walk with some missing values"""
+    x = numpy.linspace(-60.0, 0.0, count)
+    y = numpy.cumsum(numpy.random.normal(size=count))
+    y /= max(1.0, numpy.abs(y).max())
+    y[numpy.random.random(count) < 0.001] = numpy.nan
+    return x, y
+
+
+def stroke(cr, points):
+    cr.move_to(*points[0])
+    for x, y in points[1:]:
+        cr.line_to(x, y)
+    cr.stroke()
+
+
+def draw_full(cr, converter, x, y, buffer):
+    """Draw every point of the trace"""
+    points = converter.xy(numpy.column_stack((x, y)))
+    points = points[~numpy.isnan(points[:, 1])]
+    if len(points):
+        stroke(cr, points)
+
+
+def draw_decimated(cr, converter, x, y, buffer):
+    """Draw the trace reduced to a few points per pixel column"""
+    points = converter.trace(x, y, buffer)
+    if len(points):
+        stroke(cr, points)
+
+
+def run(counts, repeat=5):
+    """
+    Measure the time needed to draw a trace of increasing point counts
+    :param counts: point counts
+    :param repeat: number of frames per measurement
+    :return: list of (count, {method: frame time in seconds}) tuples
+    """
+    converter = widgets.ChartCoord(xlimits=(-60.0, 0.0), size=(WIDTH, HEIGHT))
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, WIDTH, HEIGHT)
+    buffer = utils.TraceBuffer()
+    results = []
+    for count in counts:
+        x, y = make_trace(count)
+        times = {}
+        for name, method in [('Full', draw_full), ('Decimated', draw_decimated)]:
+            cr = cairo.Context(surface)
+            cr.set_line_width(0.75)
+            start = time.perf_counter()
+            for i in range(repeat):
+                method(cr, converter, x, y, buffer)
+            surface.flush()
+            times[name] = (time.perf_counter() - start) / repeat
+        results.append((count, times))
+    return results
+
+
+def measure_allocations(count=10**5, traces=5, frames=20):
+    """
+    Measure the temporary memory allocated per frame while transforming and decimating several traces
+    :param count: number of points per trace
+    :param traces: number of traces per frame
+    :param frames: number of frames
+    :return: dictionary mapping methods to the peak bytes allocated during a frame and retained after it
+    """
+    converter = widgets.ChartCoord(xlimits=(-60.0, 0.0), size=(WIDTH, HEIGHT))
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, WIDTH, HEIGHT)
+    buffer = utils.TraceBuffer()
+    data = [make_trace(count) for i in range(traces)]
+    results = {}
+    for name, method in [('Full', draw_full), ('Decimated', draw_decimated)]:
+        cr = cairo.Context(surface)
+        for x, y in data:
+            method(cr, converter, x, y, buffer)  # warm up caches and buffers
+        peak = 0
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        for i in range(frames):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            for x, y in data:
+                method(cr, converter, x, y, buffer)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        retained = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        results[name] = (peak, retained / frames)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark drawing chart traces against their point count')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Number of frames per measurement')
+    parser.add_argument('-a', '--allocations', action='store_true', help='Measure memory allocated per frame')
+    parser.add_argument('-n', '--traces', type=int, default=5, help='Number of traces for allocation measurements')
+    parser.add_argument('counts', metavar='counts', type=int, nargs='*', default=[10**3, 10**4, 10**5, 10**6],
+                        help='Point counts')
+    args = parser.parse_args()
+
+    if args.allocations:
+        for count in args.counts:
+            sizes = measure_allocations(count=count, traces=args.traces)
+            print('{:>9} points x {} traces: {}'.format(count, args.traces, ', '.join(
+                '{} {:0.1f} kB peak/frame {:0.1f} kB retained/frame'.format(name, peak / 1024, retained / 1024)
+                for name, (peak, retained) in sizes.items()
+            )))
+        raise SystemExit
+
+    for count, times in run(args.counts, repeat=args.repeat):
+        print('{:>9} points: full {:0.2f} ms, decimated {:0.2f} ms, speed-up {:0.1f}x'.format(
+            count, times['Full'] * 1000, times['Decimated'] * 1000, times['Full'] / times['Decimated']
+        ))
@@ -0,0 +1,379 @@
+import json
+import keyword
+import os
+import xml.etree.ElementTree as ET
+
+from gi.repository import Gtk, GObject, Gdk, Pango
+
+from . import widgets, utils
+
+INTEGER_TYPES = {
+    GObject.TYPE_INT, GObject.TYPE_UINT, GObject.TYPE_LONG, GObject.TYPE_ULONG, GObject.TYPE_INT64,
+    GObject.TYPE_UINT64, GObject.TYPE_CHAR, GObject.TYPE_UCHAR
+}
+FLOAT_TYPES = {GObject.TYPE_FLOAT, GObject.TYPE_DOUBLE}
+
+# types of the child properties which can be set on children of containers
+PACKING_TYPES = {
+    'expand': bool, 'fill': bool, 'padding': int, 'position': int, 'pack_type': Gtk.PackType,
+    'x': int, 'y': int, 'left_attach': int, 'top_attach': int, 'width': int, 'height': int,
+    'tab_expand': bool, 'tab_fill': bool, 'reorderable': bool, 'detachable': bool, 'tab_label': str,
+    'menu_label': str, 'resize': bool, 'shrink': bool, 'non_homogeneous': bool, 'secondary': bool,
+}
+
+# Pango attributes of labels
+ATTRIBUTES = {
+    'weight': ('Pango.attr_weight_new', Pango.Weight),
+    'style': ('Pango.attr_style_new', Pango.Style),
+    'scale': ('Pango.attr_scale_new', float),
+    'size': ('Pango.attr_size_new', int),
+}
+
+# elements of objects handled by the generator, signals are skipped since the display manager never connects them
+ELEMENTS = {'property', 'signal', 'child', 'style', 'attributes'}
+
+MODULE_TEMPLATE = '''"""
+Widgets of the display {filename}, generated by gtkdm-compile. Do not edit, the module is only used while it
+matches the display file.
+"""
+import json
+from gi.repository import {namespaces}
+from gtkdm import widgets, utils
+
+VERSION = {version}
+SIGNATURE = {signature!r}
+DENSE = {dense}
+SYMBOLS = {symbols!r}
+
+
+def build(macros, embedded=False):
+    """
+    Create the widgets of the display
+    :param macros: dictionary of macro values
+    :param embedded: if True, create the content of the window as 'embedded_display' and the other top-level
+        objects instead of the window itself, which is created as 'related_display'
+    :return: dictionary mapping object ids to objects
+    """
+    objects = {{}}
+{body}
+    return objects
+'''
+
+
+def widget_classes():
+    """
+    Return a dictionary mapping the type names of GtkDM widgets to their expressions in generated code
+    """
+    return {
+        value.__gtype_name__: 'widgets.{}'.format(name)
+        for name, value in vars(widgets).items()
+        if isinstance(value, type) and issubclass(value, GObject.Object) and '__gtype_name__' in value.__dict__
+    }
+
+
+def text_expr(text):
+    """
+    Return the expression of a text value, substituting macros when the module is used
+    """
+    if '{' in text or '}' in text:
+        return '{!r}.format(**macros)'.format(text)
+    return repr(text)
+
+
+def literal_expr(value):
+    """
+    Return the expression of a JSON value, substituting macros in the text it contains
+    """
+    if isinstance(value, str):
+        return text_expr(value)
+    elif isinstance(value, list):
+        return '[{}]'.format(', '.join(literal_expr(item) for item in value))
+    elif isinstance(value, dict):
+        return '{{{}}}'.format(', '.join('{!r}: {}'.format(k, literal_expr(v)) for k, v in value.items()))
+    return repr(value)
+
+
+def kwargs_expr(values):
+    """
+    Return the keyword arguments of a call setting the given properties
+    :param values: list of (property name, expression) tuples
+    """
+    if all(name.isidentifier() and not keyword.iskeyword(name) for name, expr in values):
+        return ', '.join('{}={}'.format(name, expr) for name, expr in values)
+    return '**{{{}}}'.format(', '.join('{!r}: {}'.format(name, expr) for name, expr in values))
+
+
+class Generator(object):
+    """
+    Translates a display file into the source of a Python module which creates the same widgets as Gtk.Builder,
+    instantiating them directly with keyword construction instead of parsing the file and setting each property
+    through introspection. Values containing macros are substituted when the module is used.
+
+    Features which the generator does not support raise a ValueError, such displays are always loaded with
+    Gtk.Builder.
+
+    :param path: display file path
+    :param dense: whether dense drawing is enabled for all layouts
+    """
+
+    def __init__(self, path, dense=False):
+        self.path = path
+        self.dense = dense
+        self.tree = ET.parse(path)
+        self.classes = widget_classes()
+        self.specs = {}
+        self.lines = []
+        self.namespaces = {'Gtk'}
+        self.ids = {}
+        self.references = []
+        self.window = None
+        self.count = 0
+
+    def generate(self):
+        """
+        Return the source code of the module
+        """
+        widgets.Manager.defer_images(self.tree, os.path.dirname(self.path))
+        widgets.Manager.condense_layouts(self.tree, dense=self.dense)
+        root = self.tree.getroot()
+        for element in root:
+            if element.tag == 'object' and element.get('class') == 'GtkWindow':
+                self.create_window(element)
+            elif element.tag == 'object':
+                self.create(element)
+            elif element.tag != 'requires':
+                raise ValueError('Unsupported element <{}>'.format(element.tag))
+
+        for var, name, target in self.references:
+            if target not in self.ids:
+                raise ValueError('Unknown object "{}"'.format(target))
+            line = '{}.set_property({!r}, {})'.format(var, name, self.ids[target])
+            if self.window in (var, self.ids[target]):
+                line = 'if not embedded: {}'.format(line)
+            self.emit(line)
+
+        symbols = [
+            prop.text for prop in root.findall(".//object[@class='Symbol']/property[@name='file']") if prop.text
+        ]
+        return MODULE_TEMPLATE.format(
+            filename=os.path.basename(self.path), namespaces=', '.join(sorted(self.namespaces)),
+            version=utils.GENERATED_VERSION, signature=utils.file_signature(self.path), dense=self.dense,
+            symbols=symbols, body='\n'.join(self.lines),
+        )
+
+    def emit(self, line, indent=1):
+        self.lines.append('    ' * indent + line)
+
+    def create_window(self, element):
+        """
+        Generate the window, which is only created for related displays, and its content
+        """
+        content = [child for child in element.findall('child') if child.find('object') is not None]
+        if len(content) != 1 or content[0].get('type'):
+            raise ValueError('Display windows must have a single child')
+        var = self.create(content[0].find('object'), name='embedded_display')
+        self.emit('if not embedded:')
+        self.window = self.create(element, name='related_display', indent=2, window=True)
+        self.emit('{}.add({})'.format(self.window, var), indent=2)
+
+    def create(self, element, name=None, indent=1, window=False):
+        """
+        Generate an object, its properties and its children
+        :param element: xml object element
+        :param name: id of the object in the display manager, replacing the id in the display file
+        :param indent: indentation level
+        :param window: whether the object is the display window, its children are generated separately
+        :return: variable name of the object
+        """
+        type_name = 'DisplayWindow' if window else element.get('class')
+        if type_name in self.classes:
+            expr = self.classes[type_name]
+            cls = getattr(widgets, expr.split('.')[1])
+        elif type_name.startswith('Gtk') and isinstance(getattr(Gtk, type_name[3:], None), type):
+            expr = 'Gtk.{}'.format(type_name[3:])
+            cls = getattr(Gtk, type_name[3:])
+        else:
+            raise ValueError('Unsupported class {}'.format(type_name))
+
+        var = 'obj{}'.format(self.count)
+        self.count += 1
+        values = self.properties(element, cls, var)
+        if expr.startswith('widgets.'):
+            # Python widgets set up their defaults in __init__, properties from the display file are set afterwards
+            self.emit('{} = {}()'.format(var, expr), indent)
+            if values:
+                self.emit('{}.set_properties({})'.format(var, kwargs_expr(values)), indent)
+        else:
+            self.emit('{} = {}({})'.format(var, expr, kwargs_expr(values)), indent)
+
+        identifier = element.get('id')
+        if name == 'embedded_display':
+            self.emit('objects[{}] = {}'.format(
+                "'embedded_display' if embedded else {!r}".format(identifier) if identifier else "'embedded_display'",
+                var
+            ), indent)
+        elif name or identifier:
+            self.emit('objects[{!r}] = {}'.format(name or identifier, var), indent)
+        for key in (identifier, name):
+            if key:
+                self.ids[key] = var
+
+        for child in element:
+            if child.tag not in ELEMENTS:
+                raise ValueError('Unsupported element <{}> in {}'.format(child.tag, type_name))
+            elif child.tag == 'style':
+                for style in child.findall('class'):
+                    self.emit('{}.get_style_context().add_class({!r})'.format(var, style.get('name')), indent)
+            elif child.tag == 'attributes':
+                self.attributes(child, var, indent)
+            elif child.tag == 'child' and not window:
+                self.add_child(child, cls, var, indent)
+        return var
+
+    def properties(self, element, cls, var):
+        """
+        Convert the properties of an object
+        :return: list of (property name, expression) tuples. References to other objects are set once all objects
+            have been created.
+        """
+        if cls not in self.specs:
+            self.specs[cls] = {spec.name: spec for spec in cls.list_properties()}
+        values = []
+        for prop in element.findall('property'):
+            name = prop.get('name').replace('-', '_')
+            if set(prop.attrib) - {'name', 'translatable', 'context', 'comments'}:
+                raise ValueError('Unsupported property binding {}'.format(name))
+            spec = self.specs[cls].get(name.replace('_', '-'))
+            if spec is None:
+                raise ValueError('Unknown property {} of {}'.format(name, cls.__name__))
+            text = prop.text or ''
+            if cls is widgets.DenseCanvas and name == 'items':
+                values.append((name, 'json.dumps({})'.format(literal_expr(json.loads(text)))))
+            elif spec.value_type.fundamental in (GObject.TYPE_OBJECT, GObject.TYPE_INTERFACE):
+                self.references.append((var, name, text.strip()))
+            else:
+                values.append((name, self.value_expr(text, spec)))
+        return values
+
+    def value_expr(self, text, spec):
+        """
+        Return the expression of a property value
+        :param text: value in the display file
+        :param spec: GObject.ParamSpec of the property
+        """
+        fundamental = spec.value_type.fundamental
+        macros = '{' in text or '}' in text
+        if fundamental == GObject.TYPE_STRING:
+            return text_expr(text)
+        elif fundamental == GObject.TYPE_BOOLEAN:
+            return 'utils.parse_bool({})'.format(text_expr(text)) if macros else repr(utils.parse_bool(text))
+        elif fundamental in INTEGER_TYPES:
+            return 'int({})'.format(text_expr(text)) if macros else repr(int(text))
+        elif fundamental in FLOAT_TYPES:
+            return 'float({})'.format(text_expr(text)) if macros else repr(float(text))
+        elif spec.value_type == Gdk.RGBA.__gtype__:
+            self.namespaces.add('Gdk')
+            return 'widgets.ColorSequence.parse({})'.format(text_expr(text))
+        elif fundamental in (GObject.TYPE_ENUM, GObject.TYPE_FLAGS) and not macros:
+            return self.enum_expr(text, spec.value_type.pytype or type(spec.default_value))
+        raise ValueError('Unsupported value "{}" of property {}'.format(text, spec.name))
+
+    def enum_expr(self, text, cls):
+        """
+        Return the expression of an enumeration or flags value given by nicks, names or numbers
+        """
+        members = getattr(cls, '__enum_values__', None) or getattr(cls, '__flags_values__', {})
+        total = 0
+        for part in text.split('|'):
+            part = part.strip()
+            if part.lstrip('-').isdigit():
+                total |= int(part)
+                continue
+            for value, member in members.items():
+                if part in (member.value_nick, member.value_name):
+                    total |= value
+                    break
+            else:
+                raise ValueError('Unknown value "{}" of {}'.format(part, cls.__name__))
+        namespace = cls.__module__.rsplit('.', 1)[-1]
+        self.namespaces.add(namespace)
+        return '{}.{}({})'.format(namespace, cls.__name__, total)
+
+    def attributes(self, element, var, indent):
+        """
+        Generate the Pango attributes of a label
+        """
+        self.namespaces.add('Pango')
+        self.emit('attributes = Pango.AttrList()', indent)
+        for attribute in element.findall('attribute'):
+            name, value = attribute.get('name'), attribute.get('value')
+            if name not in ATTRIBUTES or set(attribute.attrib) - {'name', 'value'}:
+                raise ValueError('Unsupported attribute {}'.format(name))
+            function, kind = ATTRIBUTES[name]
+            if kind in (int, float):
+                expr = repr(kind(value))
+            else:
+                expr = self.enum_expr(value, kind)
+            self.emit('attributes.insert({}({}))'.format(function, expr), indent)
+        self.emit('{}.set_attributes(attributes)'.format(var), indent)
+
+    def add_child(self, element, cls, var, indent):
+        """
+        Generate a child object and add it to its container
+        """
+        obj = element.find('object')
+        if obj is None:
+            return  # placeholder
+        if element.get('internal-child'):
+            raise ValueError('Unsupported internal child of {}'.format(cls.__name__))
+
+        child = self.create(obj, indent=indent)
+        packing = {}
+        for prop in element.findall('packing/property'):
+            name = prop.get('name').replace('-', '_')
+            if name not in PACKING_TYPES:
+                raise ValueError('Unsupported packing property {}'.format(name))
+            kind = PACKING_TYPES[name]
+            if kind is bool:
+                packing[name] = repr(utils.parse_bool(prop.text or ''))
+            elif kind in (int, str):
+                packing[name] = repr(kind(prop.text or ''))
+            else:
+                packing[name] = self.enum_expr(prop.text or '', kind)
+
+        child_type = element.get('type')
+        if child_type == 'label' and hasattr(cls, 'set_label_widget'):
+            self.emit('{}.set_label_widget({})'.format(var, child), indent)
+        elif child_type == 'tab' and issubclass(cls, Gtk.Notebook):
+            self.emit('{0}.set_tab_label({0}.get_nth_page({0}.get_n_pages() - 1), {1})'.format(var, child), indent)
+        elif child_type:
+            raise ValueError('Unsupported child type {} of {}'.format(child_type, cls.__name__))
+        elif issubclass(cls, Gtk.Fixed) and set(packing) <= {'x', 'y'}:
+            self.emit('{}.put({}, {}, {})'.format(var, child, packing.get('x', '0'), packing.get('y', '0')), indent)
+        elif issubclass(cls, Gtk.Grid) and set(packing) <= {'left_attach', 'top_attach', 'width', 'height'}:
+            self.emit('{}.attach({}, {}, {}, {}, {})'.format(
+                var, child, packing.get('left_attach', '0'), packing.get('top_attach', '0'),
+                packing.get('width', '1'), packing.get('height', '1')
+            ), indent)
+        else:
+            self.emit('{}.add({})'.format(var, child), indent)
+            if packing:
+                self.emit('{}.child_set({}, {})'.format(var, child, kwargs_expr(list(packing.items()))), indent)
+        return child
+
+
+def compile_display(path, dense=False):
+    """
+    Generate the Python module of a display file next to it
+    :param path: display file path
+    :param dense: whether dense drawing is enabled for all layouts
+    :return: path of the generated module
+    """
+    source = Generator(path, dense=dense).generate()
+    module_path = utils.generated_path(path)
+    os.makedirs(os.path.dirname(module_path), exist_ok=True)
+    tmp_path = '{}.tmp'.format(module_path)
+    with open(tmp_path, 'w') as handle:
+        handle.write(source)
+    os.replace(tmp_path, module_path)
+    return module_path
@@ -1,9 +1,15 @@
+import collections
 import contextlib
+import hashlib
+import importlib.util
 import os
 import re
 import math
 import logging
+import threading
+import time
 import colors
+import numpy
 
 def parse_macro_spec(macro_spec):
     """
@@ -37,6 +43,54 @@ def compress_macro(macros):
     return ",".join(["{}={}".format(key, value) for key, value in sorted(macros.items())])
 
 
+def expand_ranges(spec):
+    """
+    Expand a specification of row variable ranges into all combinations of values
+    :param spec: ranges in the format "key=first..last,key=value|value|...". Numeric ranges keep the zero padding
+        of their first value.
+    :return: list of dictionaries mapping keys to values
+    """
+    rows = [{}]
+    for key, value in re.findall(r'(\w+)\s*=\s*([^,]+)', spec or ''):
+        value = value.strip()
+        match = re.match(r'^(-?\d+)\s*\.\.\s*(-?\d+)$', value)
+        if match:
+            first, last = match.groups()
+            width = len(first) if first.startswith('0') else 0
+            step = 1 if int(last) >= int(first) else -1
+            values = [str(v).zfill(width) for v in range(int(first), int(last) + step, step)]
+        else:
+            values = [v.strip() for v in value.split('|')]
+        rows = [dict(row, **{key: v}) for row in rows for v in values]
+    return rows
+
+
+def expand_pattern(pattern, variables):
+    """
+    Substitute row variables of the form $(key) in a pattern. Unknown variables are left in place.
+    :param pattern: text
+    :param variables: dictionary mapping keys to values
+    """
+    return re.sub(r'\$\((\w+)\)', lambda m: variables.get(m.group(1), m.group(0)), pattern)
+
+
+def read_channel_list(path):
+    """
+    Read a channel list file with one channel name per line, optionally followed by a label. Blank lines and
+    lines starting with '#' are ignored.
+    :param path: file path
+    :return: list of (channel, label) tuples
+    """
+    channels = []
+    with open(path, 'r') as handle:
+        for line in handle:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                fields = line.split(None, 1)
+                channels.append((fields[0], fields[1].strip() if len(fields) > 1 else ''))
+    return channels
+
+
 @contextlib.contextmanager
 def working_dir(newdir):
     """
@@ -51,6 +105,64 @@ def working_dir(newdir):
         os.chdir(curdir)
 
 
+def parse_bool(text):
+    """
+    Convert the text of a boolean property in a display file
+    """
+    return text.strip().lower() in ('true', 'yes', 't', 'y', '1')
+
+
+# Version of the modules generated from display files, modules of other versions are ignored
+GENERATED_VERSION = 1
+GENERATED = {}
+
+
+def generated_path(path):
+    """
+    Return the path of the Python module generated from a display file
+    :param path: display file path
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, '__gtkdm__', '{}.py'.format(re.sub(r'\W', '_', filename)))
+
+
+def file_signature(path):
+    """
+    Return the SHA-256 digest of a file
+    """
+    with open(path, 'rb') as handle:
+        return hashlib.sha256(handle.read()).hexdigest()
+
+
+def load_generated(path):
+    """
+    Import the module generated from a display file if it is fresh
+    :param path: display file path
+    :return: module or None if there is no generated module or it does not match the display file
+    """
+    module_path = generated_path(path)
+    if not os.path.exists(module_path):
+        return None
+
+    key = (module_path, os.path.getmtime(module_path))
+    module = GENERATED.get(key)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(
+            'gtkdm_display_{}'.format(hashlib.md5(module_path.encode()).hexdigest()), module_path
+        )
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+        except Exception as e:
+            logger.warning('Ignoring generated display module {}: {}'.format(module_path, e))
+            return None
+        GENERATED[key] = module
+
+    if getattr(module, 'VERSION', None) != GENERATED_VERSION or module.SIGNATURE != file_signature(path):
+        return None
+    return module
+
+
 SUPERSCRIPTS_TRANS = str.maketrans('0123456789+-', '⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻')
 
 
@@ -72,6 +184,669 @@ def fix_fmt(number, digits=3, sign=False):
     return f'{{:0.{digits}G}}'.format(number)
 
 
+class LRUCache(object):
+    """
+    A thread-safe least-recently-used cache bounded by a memory budget
+    :param budget: maximum total size of cached items in bytes
+    :param sizeof: function returning the size in bytes of a cached item
+    """
+
+    def __init__(self, budget, sizeof=None):
+        self.budget = budget
+        self.sizeof = sizeof if sizeof else (lambda item: 1)
+        self.items = collections.OrderedDict()
+        self.sizes = {}
+        self.usage = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, item):
+        with self.lock:
+            self.pop(key)
+            size = self.sizeof(item)
+            self.items[key] = item
+            self.sizes[key] = size
+            self.usage += size
+            # evict least recently used items, always keeping the newest one
+            while self.usage > self.budget and len(self.items) > 1:
+                old_key, _ = self.items.popitem(last=False)
+                self.usage -= self.sizes.pop(old_key)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            if key in self.items:
+                self.usage -= self.sizes.pop(key)
+                return self.items.pop(key)
+            return default
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.sizes.clear()
+            self.usage = 0
+
+    def stats(self):
+        """
+        Return a dictionary of cache statistics
+        """
+        with self.lock:
+            return {
+                'items': len(self.items),
+                'usage': self.usage,
+                'budget': self.budget,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
+class RingBuffer(object):
+    """
+    A fixed-size numpy ring buffer with O(1) appends and zero-copy ordered views
+    :param size: number of rows
+    :param columns: number of columns per row, or None for a one-dimensional buffer
+    :param dtype: data type
+    :param fill: initial value of all entries
+    """
+
+    def __init__(self, size, columns=None, dtype=float, fill=numpy.nan):
+        shape = (size,) if columns is None else (size, columns)
+        self.size = size
+        self.data = numpy.full(shape, fill, dtype=dtype)
+        self.head = 0  # position of the next write, and of the oldest entry once full
+        self.count = 0
+
+    def append(self, row):
+        self.data[self.head] = row
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def extend(self, rows):
+        rows = numpy.asarray(rows)
+        # rows beyond the buffer size are skipped, but still advance the head
+        self.head = (self.head + max(len(rows) - self.size, 0)) % self.size
+        rows = rows[-self.size:]
+        n = len(rows)
+        first = min(n, self.size - self.head)
+        self.data[self.head:self.head + first] = rows[:first]
+        self.data[:n - first] = rows[first:]
+        self.head = (self.head + n) % self.size
+        self.count = min(self.count + n, self.size)
+
+    def latest(self):
+        return self.data[self.head - 1]
+
+    def segments(self):
+        """
+        Return the full window in chronological order as a list of (offset, view) pairs without copying.
+        Offsets are the positions of the first row of each view within the window.
+        """
+        if self.head == 0:
+            return [(0, self.data)]
+        return [(0, self.data[self.head:]), (self.size - self.head, self.data[:self.head])]
+
+    def ordered(self):
+        """
+        Return a chronologically ordered copy of the full window
+        """
+        return numpy.concatenate([view for offset, view in self.segments()])
+
+    def clear(self, fill=numpy.nan):
+        self.data.fill(fill)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+
+class HistoryLevel(object):
+    """
+    One resolution level of a HistoryPyramid. Each bin summarizes `span` raw samples, and `factor` bins of
+    the level below.
+    """
+
+    def __init__(self, size, channels, span, capacity, factor):
+        self.span = span
+        self.factor = factor
+        self.size = min(capacity, int(math.ceil(size / span)))
+        self.covers = self.size * span >= size
+        self.minimum = RingBuffer(self.size, channels)
+        self.maximum = RingBuffer(self.size, channels)
+        self.mean = RingBuffer(self.size, channels)
+        self.positions = numpy.arange(self.size) - (self.size - 1.0)
+
+        # accumulator for the bin in progress
+        self.ticks = 0
+        self.acc_min = numpy.full(channels, numpy.nan)
+        self.acc_max = numpy.full(channels, numpy.nan)
+        self.acc_sum = numpy.zeros(channels)
+        self.acc_count = numpy.zeros(channels)
+
+    def accumulate(self, minimum, maximum, mean):
+        """
+        Add one bin of the level below. Returns True when a bin of this level has been completed.
+        """
+        valid = ~numpy.isnan(mean)
+        numpy.fmin(self.acc_min, minimum, out=self.acc_min)
+        numpy.fmax(self.acc_max, maximum, out=self.acc_max)
+        self.acc_sum[valid] += mean[valid]
+        self.acc_count += valid
+        self.ticks += 1
+        return self.ticks >= self.factor
+
+    def extend(self, minimum, maximum, mean):
+        """
+        Add several bins of the level below at once
+        :return: the completed bins of this level as (minimum, maximum, mean) arrays, or None
+        """
+        done = []
+        count = len(mean)
+        i = 0
+        # finish the bin in progress one bin at a time
+        while i < count and self.ticks:
+            if self.accumulate(minimum[i], maximum[i], mean[i]):
+                self.flush()
+                done.append(tuple(
+                    buf.latest()[numpy.newaxis].copy() for buf in (self.minimum, self.maximum, self.mean)
+                ))
+            i += 1
+
+        # aggregate whole bins in one step
+        blocks = (count - i) // self.factor
+        if blocks:
+            end = i + blocks * self.factor
+            shape = (blocks, self.factor, -1)
+            lo = numpy.fmin.reduce(minimum[i:end].reshape(shape), axis=1)
+            hi = numpy.fmax.reduce(maximum[i:end].reshape(shape), axis=1)
+            values = mean[i:end].reshape(shape)
+            valid = (~numpy.isnan(values)).sum(axis=1)
+            with numpy.errstate(invalid='ignore', divide='ignore'):
+                avg = numpy.where(valid > 0, numpy.nansum(values, axis=1) / valid, numpy.nan)
+            self.minimum.extend(lo)
+            self.maximum.extend(hi)
+            self.mean.extend(avg)
+            done.append((lo, hi, avg))
+            i = end
+
+        # start the next bin with the remainder
+        while i < count:
+            self.accumulate(minimum[i], maximum[i], mean[i])
+            i += 1
+
+        if done:
+            return tuple(numpy.concatenate(parts) for parts in zip(*done))
+
+    def flush(self):
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            mean = numpy.where(self.acc_count > 0, self.acc_sum / self.acc_count, numpy.nan)
+        self.minimum.append(self.acc_min)
+        self.maximum.append(self.acc_max)
+        self.mean.append(mean)
+        self.ticks = 0
+        self.acc_min.fill(numpy.nan)
+        self.acc_max.fill(numpy.nan)
+        self.acc_sum.fill(0.0)
+        self.acc_count.fill(0)
+
+    def segments(self):
+        """
+        Return the bins in chronological order as a list of (offset, minimum, maximum) views
+        """
+        return [
+            (offset, lo, hi) for (offset, lo), (_, hi) in zip(self.minimum.segments(), self.maximum.segments())
+        ]
+
+
+class HistoryPyramid(object):
+    """
+    Multi-resolution min/max/mean history of several channels, updated incrementally as samples arrive.
+    Level 0 holds the most recent samples, optionally with the range of values seen during each sample
+    period, and each higher level aggregates `factor` bins of the level
+    below, up to the first level able to hold the whole time window. Memory use is bounded by the number of
+    levels times `capacity` bins, regardless of the length of the window.
+
+    :param size: number of samples in the full time window
+    :param channels: number of channels
+    :param capacity: maximum number of bins per level
+    :param factor: aggregation factor between levels
+    """
+
+    def __init__(self, size, channels, capacity=4096, factor=4):
+        self.size = size
+        self.channels = channels
+        self.factor = factor
+        self.levels = []
+        span = 1
+        while True:
+            level = HistoryLevel(size, channels, span, capacity, factor)
+            self.levels.append(level)
+            if level.covers:
+                break
+            span *= factor
+
+    def append(self, sample, minimum=None, maximum=None):
+        """
+        Add a sample for all channels
+        :param sample: array of channel values, NaN for missing values
+        :param minimum: optional array of minimum channel values during the sample period
+        :param maximum: optional array of maximum channel values during the sample period
+        """
+        base = self.levels[0]
+        base.minimum.append(sample if minimum is None else minimum)
+        base.maximum.append(sample if maximum is None else maximum)
+        base.mean.append(sample)
+        minimum, maximum, mean = base.minimum.latest(), base.maximum.latest(), base.mean.latest()
+        for level in self.levels[1:]:
+            if not level.accumulate(minimum, maximum, mean):
+                break
+            level.flush()
+            minimum, maximum, mean = level.minimum.latest(), level.maximum.latest(), level.mean.latest()
+
+    def extend(self, samples, minimum=None, maximum=None):
+        """
+        Add several samples at once, aggregating them in bulk
+        :param samples: array of shape (count, channels), NaN for missing values
+        :param minimum: optional array of minimum values during each sample period
+        :param maximum: optional array of maximum values during each sample period
+        """
+        samples = numpy.asarray(samples, dtype=float)
+        minimum = samples if minimum is None else numpy.asarray(minimum, dtype=float)
+        maximum = samples if maximum is None else numpy.asarray(maximum, dtype=float)
+        base = self.levels[0]
+        base.minimum.extend(minimum)
+        base.maximum.extend(maximum)
+        base.mean.extend(samples)
+        bins = (minimum, maximum, samples)
+        for level in self.levels[1:]:
+            bins = level.extend(*bins)
+            if bins is None:
+                break
+
+    def select(self, width):
+        """
+        Select the finest level covering the full window with at least one bin per pixel. If no covering level has
+        that many bins, the finest covering level is used.
+        :param width: plot width in device pixels
+        :return: level index
+        """
+        covering = [index for index, level in enumerate(self.levels) if level.covers]
+        for index in covering:
+            if self.levels[index].size >= width:
+                return index
+        return covering[0]
+
+    def xdata(self, index, out=None):
+        """
+        Return the bin positions of a level in samples relative to the most recent sample
+        :param index: level index
+        :param out: optional output array of the level size
+        """
+        level = self.levels[index]
+        out = numpy.subtract(level.positions, self.lag(index), out=out)
+        out *= level.span
+        return out
+
+    def lag(self, index):
+        """
+        Return the number of samples not yet aggregated into the completed bins of a level, in units of the
+        bins of that level
+        """
+        pending = sum(self.levels[i].ticks * self.levels[i - 1].span for i in range(1, index + 1))
+        return pending / self.levels[index].span
+
+    def nbytes(self):
+        return sum(
+            level.minimum.data.nbytes + level.maximum.data.nbytes + level.mean.data.nbytes for level in self.levels
+        )
+
+
+class MessageBuffer(object):
+    """
+    A compact ring buffer of log messages, storing the timestamp, severity and UTF-8 encoded text of each message
+    in arrays. The text columns are fixed-width byte string arrays of `width` bytes per message, so memory use is
+    constant, and longer texts are truncated. A copy of the texts with lower-case ASCII letters is kept for
+    searching. Messages are addressed by sequence number, counting all messages ever appended, so that references
+    to them stay valid until they are overwritten.
+    :param size: maximum number of messages
+    :param width: maximum length of message texts in bytes
+    """
+
+    def __init__(self, size, width=256):
+        self.size = size
+        self.width = width
+        self.times = RingBuffer(size)
+        self.severities = RingBuffer(size, dtype=numpy.int8, fill=0)
+        self.texts = RingBuffer(size, dtype='S{}'.format(width), fill=b'')
+        self.folded = RingBuffer(size, dtype='S{}'.format(width), fill=b'')
+        self.total = 0
+
+    @property
+    def first(self):
+        """
+        Sequence number of the oldest message still held
+        """
+        return self.total - self.texts.count
+
+    def extend(self, times, severities, texts):
+        """
+        Append several messages at once
+        :param times: timestamps in seconds since the epoch
+        :param severities: integer alarm severities
+        :param texts: message texts
+        """
+        column = numpy.array([text.encode('utf-8')[:self.width] for text in texts], dtype=self.texts.data.dtype)
+        self.times.extend(numpy.asarray(times, dtype=float))
+        self.severities.extend(numpy.asarray(severities, dtype=numpy.int8))
+        self.texts.extend(column)
+        self.folded.extend(numpy.char.lower(column))
+        self.total += len(texts)
+
+    def row(self, seq):
+        """
+        Return the (timestamp, severity, text) of a message
+        :param seq: sequence number of a message still held
+        """
+        i = seq % self.size
+        return self.times.data[i], int(self.severities.data[i]), self.texts.data[i].decode('utf-8', 'ignore')
+
+    def search(self, text, start=None):
+        """
+        Find messages containing a text, ignoring the case of ASCII letters
+        :param text: text to search for
+        :param start: optional sequence number from which to search
+        :return: array of matching sequence numbers in order
+        """
+        first = self.first if start is None else max(start, self.first)
+        seqs = numpy.arange(first, self.total)
+        found = numpy.char.find(self.folded.data[seqs % self.size], text.encode('utf-8').lower()) >= 0
+        return seqs[found]
+
+    def clear(self):
+        self.times.clear()
+        self.severities.clear(fill=0)
+        self.texts.clear(fill=b'')
+        self.folded.clear(fill=b'')
+        self.total = 0
+
+    def __len__(self):
+        return self.texts.count
+
+
+HISTORY_DIR = os.environ.get(
+    'GTKDM_HISTORY_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'gtkdm', 'history')
+)
+
+
+class ChannelHistory(object):
+    """
+    Persistent history of a single channel, kept as a fixed-size ring of records in a memory-mapped file. Each
+    record holds a sequence number, a timestamp, a value and a checksum of the three, and is invalidated while it
+    is rewritten. The position of the ring is recovered from the highest sequence number among the records with a
+    valid checksum, independently of the wall clock, and records which were only partly written to disk when the
+    process stopped are ignored. The memory map gives no guarantee on the order in which records reach the disk,
+    so the most recent records may be lost, and while the wall clock is behind the last record new values are
+    ignored. Histories are shared by all users of the same channel within the process.
+
+    :param path: history file path
+    :param capacity: number of records in the file, ignored if the file already exists
+    :param interval: minimum time in seconds between records
+    """
+    MAGIC = b'GTKDMHS2'
+    HEADER_SIZE = 64
+    RECORD = numpy.dtype([('seq', '<u8'), ('time', '<f8'), ('value', '<f8'), ('check', '<u8')])
+    FLUSH_INTERVAL = 30.0
+
+    registry = {}
+    lock = threading.Lock()
+
+    def __init__(self, path, capacity=131072, interval=1.0):
+        self.path = path
+        self.interval = interval
+        capacity = self.read_header(path) or self.create(path, capacity)
+        self.records = numpy.memmap(path, dtype=self.RECORD, mode='r+', offset=self.HEADER_SIZE, shape=(capacity,))
+        self.capacity = capacity
+        seqs = numpy.where(self.valid(self.records), self.records['seq'], 0)
+        latest = int(seqs.argmax())
+        self.seq = int(seqs[latest])
+        self.head = (latest + 1) % capacity if self.seq else 0
+        self.last = float(self.records['time'][latest]) if self.seq else 0.0
+        self.flushed = time.time()
+
+    @staticmethod
+    def checksum(seqs, times, values):
+        """
+        Return the checksums of records
+        :param seqs: array of sequence numbers
+        :param times: array of timestamps
+        :param values: array of values
+        """
+        times = numpy.asarray(times, dtype='<f8').view('<u8')
+        values = numpy.asarray(values, dtype='<f8').view('<u8')
+        check = numpy.asarray(seqs, dtype='<u8') * numpy.uint64(0x9E3779B97F4A7C15)
+        check ^= times * numpy.uint64(0xC2B2AE3D27D4EB4F)
+        check ^= values * numpy.uint64(0x165667B19E3779F9)
+        return check ^ numpy.uint64(0x27D4EB2F165667C5)
+
+    def valid(self, records):
+        """
+        Return a mask of the records which have been completely written
+        """
+        return (records['seq'] > 0) & (records['check'] == self.checksum(
+            records['seq'], records['time'], records['value']
+        ))
+
+    def read_header(self, path):
+        """
+        Return the capacity of an existing, valid history file or None
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as handle:
+            header = handle.read(self.HEADER_SIZE)
+        if len(header) == self.HEADER_SIZE and header[:8] == self.MAGIC:
+            capacity = int(numpy.frombuffer(header, dtype='<i8', count=1, offset=8)[0])
+            if os.path.getsize(path) == self.HEADER_SIZE + capacity * self.RECORD.itemsize:
+                return capacity
+        logger.warning('Discarding invalid history file {}'.format(path))
+        return None
+
+    def create(self, path, capacity):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = self.MAGIC + numpy.array([capacity], dtype='<i8').tobytes()
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'wb') as handle:
+            handle.write(header.ljust(self.HEADER_SIZE, b'\0'))
+            handle.truncate(self.HEADER_SIZE + capacity * self.RECORD.itemsize)
+        os.replace(tmp_path, path)
+        return capacity
+
+    @classmethod
+    def open(cls, channel, capacity=131072, interval=1.0, directory=None):
+        """
+        Return the shared history of a channel, creating the history file if necessary
+        :param channel: channel name
+        :param capacity: number of records for new history files
+        :param interval: minimum time in seconds between records
+        :param directory: directory of history files, defaults to HISTORY_DIR
+        """
+        name = '{}.hist'.format(re.sub(r'[^\w.-]', '_', channel))
+        path = os.path.join(directory or HISTORY_DIR, name)
+        with cls.lock:
+            if path not in cls.registry:
+                cls.registry[path] = cls(path, capacity=capacity, interval=interval)
+            history = cls.registry[path]
+            history.interval = min(history.interval, interval)
+            return history
+
+    def append(self, timestamp, value):
+        """
+        Record a value. Values arriving sooner than the history interval after the previous one are ignored.
+        """
+        if timestamp - self.last < self.interval * 0.5:
+            return
+        self.seq += 1
+        self.records['check'][self.head] = 0  # invalid until the record is complete
+        self.records['seq'][self.head] = self.seq
+        self.records['time'][self.head] = timestamp
+        self.records['value'][self.head] = value
+        self.records['check'][self.head] = self.checksum([self.seq], [timestamp], [value])[0]
+        self.head = (self.head + 1) % self.capacity
+        self.last = timestamp
+        if timestamp - self.flushed > self.FLUSH_INTERVAL:
+            self.records.flush()
+            self.flushed = timestamp
+
+    def read(self, start=0.0):
+        """
+        Return the recorded times and values since a given time in chronological order
+        """
+        records = numpy.concatenate((self.records[self.head:], self.records[:self.head]))
+        records = records[self.valid(records) & (records['time'] >= start)]
+        return records['time'], records['value']
+
+    def resample(self, times, tolerance):
+        """
+        Sample and hold the history at the given times
+        :param times: increasing sample times
+        :param tolerance: maximum age of a held value, older values give NaN
+        :return: array of values
+        """
+        rec_times, rec_values = self.read(times[0] - tolerance)
+        index = numpy.searchsorted(rec_times, times, side='right') - 1
+        values = numpy.full(len(times), numpy.nan)
+        valid = index >= 0
+        valid[valid] = (times[valid] - rec_times[index[valid]]) <= tolerance
+        values[valid] = rec_values[index[valid]]
+        return values
+
+    def flush(self):
+        self.records.flush()
+
+
+def decimate(x, y, resolution=1.0):
+    """
+    Reduce a trace to at most four points (first, last, minimum and maximum) per pixel column, which renders
+    identically to the full trace (M4 aggregation).
+    :param x: non-decreasing x pixel coordinates
+    :param y: y pixel coordinates
+    :param resolution: column width in pixel coordinates
+    :return: decimated x and y arrays in their original order
+    """
+    if len(x) <= 4:
+        return x, y
+    bins = numpy.floor((x - x[0]) / resolution).astype(int)
+    if 4 * (bins[-1] + 1) >= len(x):
+        return x, y
+
+    starts = numpy.flatnonzero(numpy.r_[True, bins[1:] != bins[:-1]])
+    ends = numpy.r_[starts[1:], len(x)] - 1
+    # within each column, sorting by y puts the minimum first and the maximum last
+    order = numpy.lexsort((y, bins))
+    index = numpy.unique(numpy.concatenate([starts, ends, order[starts], order[ends]]))
+    return x[index], y[index]
+
+
+class TraceBuffer(object):
+    """
+    Work arrays for masking, transforming and decimating plot traces. They grow as needed and are reused between
+    frames, so that drawing does not allocate arrays proportional to the trace length.
+    :param size: initial capacity in points
+    """
+
+    def __init__(self, size=1024):
+        self.size = 0
+        self.reserve(size)
+
+    def reserve(self, size):
+        """
+        Make sure the buffers can hold at least the given number of points
+        """
+        if size > self.size:
+            self.size = max(size, 2 * self.size)
+            self.points = numpy.empty((self.size, 2))
+            self.work = numpy.empty((self.size, 2))
+            self.output = numpy.empty((self.size, 2))
+            self.columns = numpy.empty(self.size)
+            self.mask = numpy.empty(self.size, dtype=bool)
+
+
+def decimate_points(points, resolution, buffer):
+    """
+    M4 aggregation of a trace into a TraceBuffer. Each pixel column is reduced to its first, minimum, maximum
+    and last points, so that the arrays allocated are proportional to the number of columns only.
+    :param points: (count, 2) array of pixel coordinates with non-decreasing x
+    :param resolution: column width in pixel coordinates
+    :param buffer: TraceBuffer holding at least count points, points must not be buffer.output or buffer.columns
+    :return: view of the decimated points, or points itself if nothing can be saved
+    """
+    count = len(points)
+    if count <= 4:
+        return points
+    columns = buffer.columns[:count]
+    numpy.subtract(points[:, 0], points[0, 0], out=columns)
+    columns /= resolution
+    numpy.floor(columns, out=columns)
+    if 4 * (columns[-1] + 1) >= count:
+        return points
+
+    change = buffer.mask[:count]
+    change[0] = True
+    numpy.not_equal(columns[1:], columns[:-1], out=change[1:])
+    starts = numpy.flatnonzero(change)
+    ends = numpy.empty_like(starts)
+    ends[:-1] = starts[1:] - 1
+    ends[-1] = count - 1
+
+    out = buffer.output[:4 * len(starts)]
+    numpy.take(points, starts, axis=0, out=out[0::4], mode='clip')
+    numpy.take(points, ends, axis=0, out=out[3::4], mode='clip')
+    out[1::4, 0] = out[0::4, 0]
+    out[2::4, 0] = out[3::4, 0]
+    yvalues = columns
+    numpy.copyto(yvalues, points[:, 1])  # contiguous copy for the reductions
+    numpy.minimum.reduceat(yvalues, starts, out=out[1::4, 1])
+    numpy.maximum.reduceat(yvalues, starts, out=out[2::4, 1])
+    return out
+
+
+def thin_points(points, resolution=1.0):
+    """
+    Drop consecutive points which fall on the same pixel. Suitable for traces whose x values are not monotonic.
+    :param points: array of (x, y) pixel coordinates
+    :param resolution: pixel size in pixel coordinates
+    :return: array of remaining points in their original order
+    """
+    if len(points) <= 2:
+        return points
+    pixels = numpy.floor(points / resolution)
+    keep = numpy.r_[True, (pixels[1:] != pixels[:-1]).any(axis=1)]
+    keep[-1] = True
+    return points[keep]
+
+
+def is_monotonic(values):
+    """
+    Check if the values are non-decreasing
+    """
+    return len(values) < 2 or bool((numpy.diff(values) >= 0).all())
+
+
 class NullHandler(logging.Handler):
     """
     A do-nothing log handler.
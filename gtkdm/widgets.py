@@ -1,20 +1,28 @@
+import collections
 import hashlib
+import io
 import json
+import mmap
 import os
 import re
+import struct
 import subprocess
 import textwrap
+import threading
 import time
+import weakref
 import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from math import atan2, pi, cos, sin, ceil
+from math import atan2, pi, cos, sin, ceil, floor, log10
 
+import cairo
 import gi
 import numpy
 
 gi.require_version('Gtk', '3.0')
 gi.require_version('PangoCairo', "1.0")
-from gi.repository import Gtk, GObject, Gdk, Gio, GdkPixbuf, GLib, PangoCairo
+from gi.repository import Gtk, GObject, Gdk, Gio, GdkPixbuf, GLib, Pango, PangoCairo
 
 from epics.ca import ChannelAccessGetFailure
 import gepics
@@ -55,6 +63,202 @@ FONT_SIZES = {
     -3: 'xxs', -2: 'xs', -1: 'sm', 0: 'md', 1: 'lg', 2: 'xl', 3: 'xxl'
 }
 
+# relative font sizes of the FONT_SIZES style classes
+FONT_SCALES = {
+    -3: 0.75, -2: 0.85, -1: 0.95, 0: 1.0, 1: 1.2, 2: 1.3, 3: 1.5
+}
+
+# Worker threads for loading and rasterizing images off the main loop
+WORKERS = ThreadPoolExecutor(max_workers=4, thread_name_prefix='gtkdm')
+
+
+def surface_size(surface):
+    """Return the size of a cairo image surface in logical pixels"""
+    xscale, yscale = surface.get_device_scale()
+    return surface.get_width() / xscale, surface.get_height() / yscale
+
+
+class Tick(object):
+    """
+    A subscription to the Clock
+    """
+
+    def __init__(self, interval, callback, args, once=False):
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.once = once
+        self.due = 0.0
+        self.calls = 0
+        self.cpu_time = 0.0
+        self.name = getattr(callback, '__qualname__', repr(callback))
+
+    def schedule(self, now):
+        if self.once:
+            self.due = now + self.interval
+        else:
+            # align to wall-clock multiples of the interval, skipping missed ticks
+            self.due = (now // self.interval + 1) * self.interval
+
+
+class Clock(object):
+    """
+    Process-wide tick scheduler. A single main-loop timeout fans out to all subscribers at their requested
+    intervals. Periodic ticks are aligned to wall-clock multiples of the interval, for example exactly on the
+    second for a one second interval. Subscriptions owned by a widget are dropped when it is destroyed.
+    """
+    subscribers = {}
+    source = 0
+    deadline = None
+    counter = 0
+
+    @classmethod
+    def subscribe(cls, interval, callback, *args, owner=None, once=False):
+        """
+        Call a function periodically. It is unsubscribed when it returns a false value.
+        :param interval: interval in seconds
+        :param callback: function to call with the given arguments
+        :param owner: optional widget, the subscription is dropped when it is destroyed
+        :param once: call the function only once, after the interval, instead of periodically
+        :return: subscription id
+        """
+        cls.counter += 1
+        key = cls.counter
+        tick = Tick(interval, callback, args, once=once)
+        tick.schedule(time.time())
+        cls.subscribers[key] = tick
+        if owner is not None:
+            owner.connect('destroy', lambda widget: cls.unsubscribe(key))
+        cls.arm()
+        return key
+
+    @classmethod
+    def unsubscribe(cls, key):
+        cls.subscribers.pop(key, None)
+
+    @classmethod
+    def arm(cls):
+        """
+        Make sure the main-loop timeout fires at the earliest due subscription
+        """
+        if not cls.subscribers:
+            return
+        due = min(tick.due for tick in cls.subscribers.values())
+        if cls.source and cls.deadline <= due:
+            return
+        if cls.source:
+            GLib.source_remove(cls.source)
+        cls.deadline = due
+        # timeouts have millisecond resolution, round up so that ticks never fire before their boundary
+        delay = max(0, int(ceil((due - time.time()) * 1000)) + 1)
+        cls.source = GLib.timeout_add(delay, cls.dispatch)
+
+    @classmethod
+    def dispatch(cls):
+        cls.source = 0
+        now = time.time()
+        for key, tick in list(cls.subscribers.items()):
+            if tick.due > now or key not in cls.subscribers:
+                continue
+            start = time.thread_time()
+            try:
+                keep = tick.callback(*tick.args)
+            except Exception as e:
+                logger.error('Clock subscriber {} failed: {}'.format(tick.name, e))
+                keep = False
+            tick.cpu_time += time.thread_time() - start
+            tick.calls += 1
+            if tick.once or not keep:
+                cls.unsubscribe(key)
+            else:
+                tick.schedule(now)
+        cls.arm()
+        return False
+
+    @classmethod
+    def stats(cls):
+        """
+        Return a list of dictionaries with the interval, number of calls and total CPU time in seconds of each
+        subscriber
+        """
+        return [
+            {'name': tick.name, 'interval': tick.interval, 'calls': tick.calls, 'cpu_time': tick.cpu_time}
+            for tick in cls.subscribers.values()
+        ]
+
+
+class Channels(object):
+    """
+    Tracks the process variables opened on behalf of widgets so that they are released deterministically when
+    their owner is destroyed, instead of keeping channels and callbacks alive after a display is closed.
+    """
+    owners = {}
+    suspended = set()
+
+    @classmethod
+    def open(cls, owner, name):
+        """
+        Create a process variable owned by a widget
+        :param owner: Gtk.Widget, the process variable is released when it is destroyed. If None, the caller is
+            responsible for releasing it.
+        :param name: process variable name
+        :return: gepics.PV
+        """
+        pv = gepics.PV(name)
+        if owner is not None:
+            if owner not in cls.owners:
+                cls.owners[owner] = []
+                owner.connect('destroy', cls.release)
+            cls.owners[owner].append(pv)
+        return pv
+
+    @classmethod
+    def release(cls, owner):
+        """
+        Release all process variables owned by a widget
+        """
+        cls.suspended.discard(owner)
+        for pv in cls.owners.pop(owner, []):
+            cls.close(pv)
+
+    @classmethod
+    def suspend(cls, owner, suspended=True):
+        """
+        Suspend or resume the monitors of all process variables owned by a widget. Suspended process variables stay
+        connected but receive no updates, and a current value is delivered when they are resumed.
+        :param owner: Gtk.Widget
+        :param suspended: True to suspend, False to resume
+        """
+        if owner not in cls.owners or (owner in cls.suspended) == suspended:
+            return
+        if suspended:
+            cls.suspended.add(owner)
+        else:
+            cls.suspended.discard(owner)
+        if not gepics.REUSE:  # reused channels may still be shared with other process variables
+            for pv in cls.owners[owner]:
+                pv.raw.auto_monitor = not suspended
+
+    @staticmethod
+    def close(pv):
+        """
+        Disconnect all signal handlers of a process variable and close its channel
+        """
+        GObject.signal_handlers_destroy(pv)
+        if not gepics.REUSE:  # reused channels may still be shared with other process variables
+            pv.raw.disconnect()
+
+    @classmethod
+    def stats(cls):
+        """
+        Return a dictionary with the numbers of owners, open process variables and suspended owners
+        """
+        return {
+            'owners': len(cls.owners),
+            'channels': sum(len(pvs) for pvs in cls.owners.values()),
+            'suspended': len(cls.suspended),
+        }
+
 
 class DisplayManager(object):
     """Manages all displays"""
@@ -62,6 +266,7 @@ class DisplayManager(object):
     def __init__(self):
         self.macros = {}
         self.registry = {}
+        self.dense = False
         self.clipboard = Gtk.Clipboard.get(Gdk.SELECTION_PRIMARY)
         self.search_paths = [os.getcwd()] + os.environ.get('GTKDM_DISPLAY_PATH', '').split(':')
 
@@ -93,6 +298,164 @@ class DisplayManager(object):
 
         return full_path
 
+    def prefetch_symbols(self, tree):
+        """
+        Start loading all symbol files used by a display in parallel
+        :param tree: xml widget element tree
+        """
+        paths = [
+            self.find_display(prop.text)
+            for prop in tree.findall(".//object[@class='Symbol']/property[@name='file']") if prop.text
+        ]
+        SymbolFrames.prefetch(filter(None, paths))
+
+    def condense_layouts(self, tree, dense=None):
+        """
+        Replace the simple monitors of dense layouts with DenseCanvas widgets drawing them. Each run of consecutive
+        replaceable children is drawn by one canvas, placed where the first child of the run was and sized to the
+        bounding box of its items, so that the stacking order of the display file is kept. Layouts are dense if
+        their 'dense' property is set or if dense drawing is enabled for all displays.
+        :param tree: xml widget element tree
+        :param dense: whether dense drawing is enabled for all layouts, defaults to the manager setting
+        """
+        dense = self.dense if dense is None else dense
+        for layout in tree.findall(".//object[@class='Layout']"):
+            flag = layout.find("property[@name='dense']")
+            if not (dense or (flag is not None and utils.parse_bool(flag.text or ''))):
+                continue
+
+            runs = [[]]
+            for element in list(layout):
+                item = DenseCanvas.parse_item(element) if element.tag == 'child' else None
+                if item:
+                    runs[-1].append((element, item))
+                elif element.tag == 'child' and runs[-1]:
+                    runs.append([])
+            for run in filter(None, runs):
+                self.insert_canvas(layout, run)
+
+    @staticmethod
+    def insert_canvas(layout, run):
+        """
+        Replace a run of consecutive layout children with a DenseCanvas drawing them
+        :param layout: xml object element of the layout
+        :param run: list of (child element, item description) tuples
+        """
+        items = [item for child, item in run]
+        x = min(item['rect'][0] for item in items)
+        y = min(item['rect'][1] for item in items)
+        for item in items:
+            item['rect'][0] -= x
+            item['rect'][1] -= y
+
+        canvas = ET.Element('child')
+        spec = ET.SubElement(ET.SubElement(canvas, 'object', {'class': 'DenseCanvas'}), 'property')
+        spec.set('name', 'items')
+        spec.text = json.dumps(items)
+        packing = ET.SubElement(canvas, 'packing')
+        ET.SubElement(packing, 'property', {'name': 'x'}).text = str(x)
+        ET.SubElement(packing, 'property', {'name': 'y'}).text = str(y)
+        layout.insert(list(layout).index(run[0][0]), canvas)
+        for child, item in run:
+            layout.remove(child)
+
+    @staticmethod
+    def defer_images(tree, directory):
+        """
+        Pass the image files of Diagram 'pixbuf' properties as 'file' properties instead, so that they are loaded
+        and rasterized at their allocated size on the worker threads rather than decoded by Gtk.Builder on the main
+        thread while the display is built. Gtk.Builder resolves relative pixbuf paths against the display file, so
+        they are made absolute here, except for values which still contain macros.
+        :param tree: xml widget element tree
+        :param directory: directory of the display file
+        """
+        for diagram in tree.findall(".//object[@class='Diagram']"):
+            prop = diagram.find("property[@name='pixbuf']")
+            if prop is not None:
+                if prop.text and diagram.find("property[@name='file']") is None:
+                    prop.set('name', 'file')
+                    if not (os.path.isabs(prop.text) or '{' in prop.text):
+                        prop.text = os.path.join(os.path.abspath(directory), prop.text)
+                else:
+                    diagram.remove(prop)
+
+    def load_builder(self, path, macros, embedded=False):
+        """
+        Create the widgets of a display file with Gtk.Builder
+        :param path: full path of the display file
+        :param macros: dictionary of macro values
+        :param embedded: if True, load the content of the window as 'embedded_display' and the other top-level
+            objects instead of the window itself, which is loaded as 'related_display'
+        :return: Gtk.Builder
+        """
+        filename = os.path.basename(path)
+        tree = ET.parse(path)
+        if embedded:
+            w = tree.find(".//object[@class='GtkWindow']/child/object[1]")
+            w.set('id', 'embedded_display')
+        else:
+            w = tree.find(".//object[@class='GtkWindow']")
+            w.set('class', 'DisplayWindow')  # Switch to full Window
+            w.set('id', 'related_display')
+
+        try:
+            utils.update_properties(tree, macros)
+        except KeyError as e:
+            logger.warn('Macro {} not specified for display "{}"'.format(e, filename))
+        self.prefetch_symbols(tree)
+        self.defer_images(tree, os.path.dirname(path))
+        self.condense_layouts(tree)
+        data = (
+                '<?xml version="1.0" encoding="UTF-8"?>\n' +
+                ET.tostring(tree.getroot(), encoding='unicode', method='xml')
+        )
+        if embedded:
+            # get list of non GtkWindow Top levels. These should be loaded.
+            top_levels = list(
+                {
+                    element.get('id') for element in tree.findall("./object")
+                } - {
+                    element.get('id') for element in tree.findall("./object[@class='GtkWindow']")
+                }
+            ) + ['embedded_display']
+            builder = Gtk.Builder()
+            builder.add_objects_from_string(data, top_levels)
+        else:
+            builder = Gtk.Builder.new_from_string(data, -1)
+        return builder
+
+    def load_generated(self, path, macros, embedded=False):
+        """
+        Create the widgets of a display file with the Python module generated from it by gtkdm-compile, if the
+        module is fresh.
+        :param path: full path of the display file
+        :param macros: dictionary of macro values
+        :param embedded: if True, create the content of the window as 'embedded_display' and the other top-level
+            objects instead of the window itself, which is created as 'related_display'
+        :return: Gtk.Builder exposing the created objects or None if the display file has to be loaded instead
+        """
+        module = utils.load_generated(path)
+        if module is None or module.DENSE != self.dense:
+            return None
+
+        paths = []
+        for spec in module.SYMBOLS:
+            try:
+                paths.append(self.find_display(spec.format(**macros)))
+            except KeyError:
+                pass
+        SymbolFrames.prefetch(filter(None, paths))
+
+        try:
+            objects = module.build(macros, embedded=embedded)
+        except KeyError:
+            return None  # the display file is loaded instead, reporting the missing macros
+
+        builder = Gtk.Builder()
+        for name, obj in objects.items():
+            builder.expose_object(name, obj)
+        return builder
+
     def show_display(self, path, macros_spec="", main=False, multiple=False):
         """
         Show a display file
@@ -101,6 +464,7 @@ class DisplayManager(object):
         :param macros_spec: macro specification
         :param main: Whether this is a main window or a related display
         :param multiple: Whether multiple instances are allowed or not
+        :return: the DisplayWindow or None if the display file was not found
         """
         global EDITOR
         if main:
@@ -114,10 +478,6 @@ class DisplayManager(object):
         logger.info(f"Loading: {full_path}...")
 
         directory, filename = os.path.split(full_path)
-        tree = ET.parse(full_path)
-        w = tree.find(".//object[@class='GtkWindow']")
-        w.set('class', 'DisplayWindow')  # Switch to full Window
-        w.set('id', 'related_display')
         new_macros = {}
         new_macros.update(self.macros)
         new_macros.update(utils.parse_macro_spec(macros_spec))
@@ -125,16 +485,10 @@ class DisplayManager(object):
         unique_text = ('{}{}'.format(filename, new_macro_spec)).encode('utf-8')
         key = hashlib.sha256(unique_text).hexdigest()
         if multiple or key not in self.registry:
-            try:
-                utils.update_properties(tree, new_macros)
-            except KeyError as e:
-                logger.warn('Macro {} not specified for display "{}"'.format(e, filename))
-            data = (
-                    '<?xml version="1.0" encoding="UTF-8"?>\n' +
-                    ET.tostring(tree.getroot(), encoding='unicode', method='xml')
-            )
             with utils.working_dir(directory):
-                builder = Gtk.Builder.new_from_string(data, -1)
+                builder = (
+                    self.load_generated(full_path, new_macros) or self.load_builder(full_path, new_macros)
+                )
                 window = builder.get_object('related_display')
                 window.builder = builder
                 window.macros = new_macro_spec
@@ -149,6 +503,7 @@ class DisplayManager(object):
         else:
             window = self.registry[key]
             window.present()
+        return window
 
     def embed_display(self, frame, path, macros_spec=""):
         """
@@ -167,34 +522,15 @@ class DisplayManager(object):
             return
 
         directory, filename = os.path.split(full_path)
-        tree = ET.parse(full_path)
-        w = tree.find(".//object[@class='GtkWindow']/child/object[1]")
-        w.set('id', 'embedded_display')
-
-        # get list of non GtkWindow Top levels. These should be loaded.
-        top_levels = list(
-            {
-                element.get('id') for element in tree.findall("./object")
-            } - {
-                element.get('id') for element in tree.findall("./object[@class='GtkWindow']")
-            }
-        ) + ['embedded_display']
-
         new_macros = {}
         new_macros.update(self.macros)
         new_macros.update(utils.parse_macro_spec(macros_spec))
         new_macro_spec = utils.compress_macro(new_macros)
-        try:
-            utils.update_properties(tree, new_macros)
-        except KeyError as e:
-            logger.warn('Macro {} not specified for display "{}"'.format(e, filename))
-        data = (
-                '<?xml version="1.0" encoding="UTF-8"?>\n' +
-                ET.tostring(tree.getroot(), encoding='unicode', method='xml')
-        )
         with utils.working_dir(directory):
-            builder = Gtk.Builder()
-            builder.add_objects_from_string(data, top_levels)
+            builder = (
+                self.load_generated(full_path, new_macros, embedded=True) or
+                self.load_builder(full_path, new_macros, embedded=True)
+            )
             display = builder.get_object('embedded_display')
             child = frame.get_child()
             if child:
@@ -215,12 +551,14 @@ class ColorSequence(object):
         self.specs = [colors.TANGO.get(v, '#000000') for v in sequence]
 
     def __call__(self, value, alpha=1.0):
+        return self.parse(self.spec(value))
+
+    def spec(self, value):
         try:
             i = min(value, len(self.specs) - 1)
         except ValueError:
             i = 0
-        spec = self.specs[i]
-        return self.parse(spec)
+        return self.specs[i]
 
     def __getitem__(self, item):
         try:
@@ -253,24 +591,286 @@ def radians(a):
 
 
 def ticks(lo, hi, step):
-    return [i * step + ceil(float(lo) / step) * step for i in range(1 + int(ceil((float(hi) - lo) / step)))]
+    """
+    Return evenly spaced tick values covering a range
+    :param lo: lower limit
+    :param hi: upper limit
+    :param step: tick spacing
+    :return: numpy array of tick values
+    """
+    count = 1 + int(ceil((float(hi) - lo) / step))
+    return numpy.arange(count) * step + ceil(float(lo) / step) * step
+
+
+AxisTicks = collections.namedtuple('AxisTicks', 'minimum maximum major minor')
+
+
+class AxisEngine(object):
+    """
+    Tick generation and axis layout shared by the Gauge, XYScatter and StripPlot widgets. Results are memoized
+    on their parameters so that charts with steady limits and allocation reuse them on every draw.
+    """
+    registry = utils.LRUCache(256)
+    layouts = utils.LRUCache(256)
+    surfaces = utils.LRUCache(32 * 1024 * 1024, sizeof=lambda surface: surface.get_stride() * surface.get_height())
+    headroom = 0.1
+
+    @classmethod
+    def ticks(cls, vmin, vmax, vstep, vticks):
+        """
+        Return the rounded limits and the major and minor ticks of an axis
+        :param vmin: lower limit
+        :param vmax: upper limit
+        :param vstep: major tick spacing
+        :param vticks: number of minor ticks per major step
+        :return: AxisTicks, major and minor ticks are read-only numpy arrays
+        """
+        key = (vmin, vmax, vstep, vticks)
+        axis = cls.registry.get(key)
+        if axis is None:
+            minimum = (vmin // vstep) * vstep
+            maximum = ceil(vmax // vstep) * vstep
+            major = ticks(minimum, maximum, vstep)
+            if vticks:
+                minor = ticks(minimum, maximum, vstep / (vticks + 1))
+                minor = minor[numpy.arange(len(minor)) % (vticks + 1) != 0]
+            else:
+                minor = numpy.empty(0)
+            major.setflags(write=False)
+            minor.setflags(write=False)
+            axis = AxisTicks(minimum, maximum, major, minor)
+            cls.registry.put(key, axis)
+        return axis
+
+    @classmethod
+    def layout(cls, xlimits, xstep, xticks, ylimits, ystep, yticks, size, margins=(0, 0), offsets=(0.0, 0.0)):
+        """
+        Return the axis layout of a chart
+        :param xlimits: (minimum, maximum) of the x-axis
+        :param xstep: x-axis major tick spacing
+        :param xticks: x-axis minor ticks per major step
+        :param ylimits: (minimum, maximum) of the y-axis
+        :param ystep: y-axis major tick spacing
+        :param yticks: y-axis minor ticks per major step
+        :param size: (width, height) of the allocation
+        :param margins: (x, y) margins
+        :param offsets: (x, y) space reserved for the axis labels
+        :return: dictionary of rounded limits, tick points and the ChartCoord converter. Shared, do not modify.
+        """
+        key = (tuple(xlimits), xstep, xticks, tuple(ylimits), ystep, yticks, tuple(size), tuple(margins),
+               tuple(offsets))
+        params = cls.layouts.get(key)
+        if params is None:
+            xaxis = cls.ticks(xlimits[0], xlimits[1], xstep, xticks)
+            yaxis = cls.ticks(ylimits[0], ylimits[1], ystep, yticks)
+            params = {
+                'key': key,
+                'size': tuple(size),
+                'xmin': xaxis.minimum,
+                'xmax': xaxis.maximum,
+                'xmajor': numpy.column_stack((xaxis.major, numpy.full(len(xaxis.major), yaxis.minimum))),
+                'xminor': numpy.column_stack((xaxis.minor, numpy.full(len(xaxis.minor), yaxis.minimum))),
+                'ymin': yaxis.minimum,
+                'ymax': yaxis.maximum,
+                'ymajor': numpy.column_stack((numpy.full(len(yaxis.major), xaxis.minimum), yaxis.major)),
+                'yminor': numpy.column_stack((numpy.full(len(yaxis.minor), xaxis.minimum), yaxis.minor)),
+                'converter': ChartCoord(
+                    xlimits=(xaxis.minimum, xaxis.maximum),
+                    ylimits=(yaxis.minimum, yaxis.maximum),
+                    size=size, margins=margins, xoffset=offsets[0], yoffset=offsets[1]
+                )
+            }
+            cls.layouts.put(key, params)
+        return params
+
+    @classmethod
+    def autoscale(cls, lo, hi, data_lo, data_hi):
+        """
+        Expand an axis range to include the data. The expanded side gets some headroom so that the range only
+        changes again once the data leaves it.
+        :param lo: current lower limit
+        :param hi: current upper limit
+        :param data_lo: minimum data value
+        :param data_hi: maximum data value
+        :return: (lower, upper) limits
+        """
+        span = max(data_hi, hi) - min(data_lo, lo)
+        if data_lo < lo:
+            lo = data_lo - span * cls.headroom
+        if data_hi > hi:
+            hi = data_hi + span * cls.headroom
+        return lo, hi
+
+    @staticmethod
+    def step(lo, hi):
+        """
+        Return a decade step size suitable for an axis range. The exponent is truncated towards zero, so ranges
+        within one of zero get a step of one.
+        """
+        extent = max(abs(lo), abs(hi))
+        return 10 ** int(log10(extent)) if extent > 0 else 1.0
+
+    @classmethod
+    def layer(cls, params, scale, color, fontsize, digits, show_xaxis=True, show_yaxis=True):
+        """
+        Return the axes, ticks and labels of a chart layout rendered on a transparent surface, rendering it
+        only when the layout, scale, color or font change
+        :param params: layout returned by layout()
+        :param scale: widget scale factor
+        :param color: foreground color
+        :param fontsize: label font size
+        :param digits: significant digits of labels
+        :param show_xaxis: whether to draw the x-axis
+        :param show_yaxis: whether to draw the y-axis
+        :return: cairo.ImageSurface the size of the allocation
+        """
+        key = (params['key'], scale, tuple(color), fontsize, digits, show_xaxis, show_yaxis)
+        surface = cls.surfaces.get(key)
+        if surface is None:
+            width, height = params['size']
+            surface = cairo.ImageSurface(
+                cairo.FORMAT_ARGB32, max(1, int(ceil(width * scale))), max(1, int(ceil(height * scale)))
+            )
+            surface.set_device_scale(scale, scale)
+            cr = cairo.Context(surface)
+            cr.set_source_rgba(*color)
+            cr.set_line_width(0.75)
+            cr.set_font_size(fontsize)
+            cls.draw_axes(cr, params, digits, show_xaxis, show_yaxis)
+            surface.flush()
+            cls.surfaces.put(key, surface)
+        return surface
+
+    @staticmethod
+    def draw_axes(cr, params, digits, show_xaxis=True, show_yaxis=True):
+        """
+        Draw the axes, ticks and labels of a chart layout with the current source, line width and font
+        """
+        if show_xaxis:
+            xframe = params['converter'].xy(
+                [
+                    (params['xmin'], params['ymin']),
+                    (params['xmax'], params['ymin']),
+                    (params['xmin'], params['ymax']),
+                    (params['xmax'], params['ymax'])
+                ],
+                yoff=5
+            )
+            cr.move_to(*xframe[0])
+            cr.line_to(*xframe[1])
+            cr.stroke()
+
+            major = params['converter'].xy(params['xmajor'], yoff=5)
+            for i, tick in enumerate(major):
+                vtick = params['xmajor'][i]
+                cr.move_to(tick[0], tick[1])
+                cr.line_to(tick[0], tick[1] + 5)
+                cr.stroke()
+                text = ('{{:0.{}g}}'.format(digits)).format(vtick[0])
+                xb, yb, w, h = cr.text_extents(text)[:4]
+                cr.move_to(tick[0] - xb - w / 2, tick[1] + 7 - yb)
+                cr.show_text(text)
+
+            if len(params['xminor']):
+                minor = params['converter'].xy(params['xminor'], yoff=5)
+                for tick in minor:
+                    cr.move_to(tick[0], tick[1])
+                    cr.line_to(tick[0], tick[1] + 3)
+                    cr.stroke()
+
+        if show_yaxis:
+            yframe = params['converter'].xy(
+                [
+                    (params['xmin'], params['ymin']),
+                    (params['xmin'], params['ymax']),
+                    (params['xmax'], params['ymin']),
+                    (params['xmax'], params['ymax'])
+                ],
+                xoff=-5
+            )
+
+            cr.move_to(*yframe[0])
+            cr.line_to(*yframe[1])
+            cr.stroke()
+
+            major = params['converter'].xy(params['ymajor'], xoff=-5)
+            for i, tick in enumerate(major):
+                vtick = params['ymajor'][i]
+                cr.move_to(tick[0], tick[1])
+                cr.line_to(tick[0] - 5, tick[1])
+                cr.stroke()
+                text = ('{{:0.{}g}}'.format(digits)).format(vtick[1])
+                xb, yb, w, h = cr.text_extents(text)[:4]
+                cr.move_to(tick[0] - 7 - w - xb, tick[1] - yb - h / 2)
+                cr.show_text(text)
+
+            if len(params['yminor']):
+                minor = params['converter'].xy(params['yminor'], xoff=-5)
+                for tick in minor:
+                    cr.move_to(tick[0], tick[1])
+                    cr.line_to(tick[0] - 2, tick[1])
+                    cr.stroke()
 
 
 def tick_points(vmin, vmax, vstep, vticks):
-    minimum = (vmin // vstep) * vstep
-    maximum = ceil(vmax // vstep) * vstep
-    major = ticks(minimum, maximum, vstep)
-    if vticks:
-        minor_raw = ticks(minimum, maximum, vstep / (vticks + 1))
-        minor = [minor_raw[v] for v in list(range(len(minor_raw))) if v % (vticks + 1) != 0]
-    else:
-        minor = []
-    return minimum, maximum, major, minor
+    return AxisEngine.ticks(vmin, vmax, vstep, vticks)
 
 
 Direction = Gdk.WindowEdge
 
 
+class LEDSprites(object):
+    """
+    Process-wide atlas of pre-rendered LED images shared by all Byte and Indicator widgets. Sprites are keyed by
+    (size, fill color, border color, scale factor) and blitted instead of rasterizing the LED path on every draw.
+    """
+    registry = {}
+    line_width = 0.75
+    padding = 1.5
+
+    @classmethod
+    def get(cls, size, color, border, scale=1):
+        """
+        Return the LED sprite for the given parameters, rendering it on first use
+        :param size: LED size in logical pixels
+        :param color: fill color specification
+        :param border: border color specification
+        :param scale: widget scale factor
+        :return: cairo.ImageSurface
+        """
+        key = (size, color, border, scale)
+        sprite = cls.registry.get(key)
+        if sprite is None:
+            sprite = cls.render(size, color, border, scale)
+            cls.registry[key] = sprite
+        return sprite
+
+    @classmethod
+    def render(cls, size, color, border, scale=1):
+        extent = size + 2 * cls.padding
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, ceil(extent * scale), ceil(extent * scale))
+        surface.set_device_scale(scale, scale)
+        cr = cairo.Context(surface)
+        cr.set_line_width(cls.line_width)
+        cr.rectangle(cls.padding, cls.padding, size, size)
+        cr.set_source_rgba(*ColorSequence.parse(color))
+        cr.fill_preserve()
+        cr.set_source_rgba(*ColorSequence.parse(border))
+        cr.stroke()
+        surface.flush()
+        return surface
+
+    @classmethod
+    def blit(cls, cr, sprite, x, y, size):
+        """
+        Paint an LED sprite so that the LED square lands at the (half-pixel aligned) position x, y
+        """
+        extent = size + 2 * cls.padding
+        cr.set_source_surface(sprite, x - cls.padding, y - cls.padding)
+        cr.rectangle(x - cls.padding, y - cls.padding, extent, extent)
+        cr.fill()
+
+
 class BlankWidget(Gtk.Widget):
 
     def __init__(self, *args, **kwargs):
@@ -300,39 +900,149 @@ class BlankWidget(Gtk.Widget):
             return parent.get_toplevel()
 
 
+class StyleBatch(object):
+    """
+    Per-frame batching of style class changes. Changes requested for a widget are merged and applied once in
+    the update phase of its frame clock, and classes which are already in the requested state are left alone,
+    so that the style context is only invalidated on real transitions. Pending changes only hold weak references
+    to their widgets, so that they never keep a destroyed widget alive.
+    """
+    pending = weakref.WeakKeyDictionary()
+    clocks = {}
+    applied = 0
+    avoided = 0
+
+    @classmethod
+    def update(cls, widget, classes):
+        """
+        Request style class changes for a widget
+        :param widget: Gtk.Widget
+        :param classes: dictionary mapping style class names to whether they should be present
+        """
+        cls.pending.setdefault(widget, {}).update(classes)
+        clock = widget.get_frame_clock()
+        if clock is None:
+            # not realized yet, nothing to batch with
+            cls.apply(widget, cls.pending.pop(widget))
+        else:
+            if clock not in cls.clocks:
+                cls.clocks[clock] = clock.connect('update', cls.on_update)
+            clock.request_phase(Gdk.FrameClockPhase.UPDATE)
+
+    @classmethod
+    def apply(cls, widget, classes):
+        style = widget.get_style_context()
+        for name, present in classes.items():
+            if style.has_class(name) == present:
+                cls.avoided += 1
+            elif present:
+                style.add_class(name)
+                cls.applied += 1
+            else:
+                style.remove_class(name)
+                cls.applied += 1
+
+    @classmethod
+    def on_update(cls, clock):
+        clock.disconnect(cls.clocks.pop(clock))
+        # widgets unrealized since their changes were requested will not see another update of their clock
+        pending = [
+            (widget, classes) for widget, classes in list(cls.pending.items())
+            if widget.get_frame_clock() in (clock, None)
+        ]
+        for widget, classes in pending:
+            del cls.pending[widget]
+            cls.apply(widget, classes)
+
+    @classmethod
+    def stats(cls):
+        """
+        Return a dictionary with the numbers of style class changes applied and of redundant changes avoided
+        """
+        return {'applied': cls.applied, 'avoided': cls.avoided, 'pending': len(cls.pending)}
+
+
+def alarm_classes(alarm):
+    return {'gtkdm-warning': alarm == gepics.Alarm.MINOR, 'gtkdm-critical': alarm == gepics.Alarm.MAJOR}
+
+
+class ThemeMixin(object):
+    """
+    Per-widget snapshot of the theme colors resolved from CSS for custom-drawn widgets. It is refreshed only when
+    the style or the state flags of the widget change instead of being looked up on every draw.
+    """
+    theme_colors = None
+    theme_handlers = None
+
+    def get_theme(self):
+        """
+        Return a dictionary of 'foreground', 'background', 'warning', 'critical' and 'border' Gdk.RGBA colors. The LED
+        border color can be set with the 'gtkdm_border_color' named color and defaults to black.
+        """
+        if self.theme_colors is None:
+            if self.theme_handlers is None:
+                self.theme_handlers = [
+                    self.connect('style-updated', self.on_theme_changed),
+                    self.connect('state-flags-changed', self.on_theme_changed),
+                ]
+            style = self.get_style_context()
+            state = style.get_state()
+            self.theme_colors = {
+                'foreground': style.get_color(state),
+                'background': style.get_property('background-color', state),
+                'warning': self.lookup_theme_color(style, 'warning_color', 'Orange'),
+                'critical': self.lookup_theme_color(style, 'error_color', 'Red'),
+                'border': self.lookup_theme_color(style, 'gtkdm_border_color', 'Black'),
+            }
+        return self.theme_colors
+
+    @staticmethod
+    def lookup_theme_color(style, name, default):
+        found, color = style.lookup_color(name)
+        if not found:
+            color = Gdk.RGBA()
+            color.parse(default)
+        return color
+
+    def on_theme_changed(self, *args):
+        self.theme_colors = None
+
+
 class AlarmMixin(object):
+    alarm_state = None
+
     def on_alarm(self, pv, alarm):
         if self.alarm:
-            if alarm == gepics.Alarm.MAJOR:
-                self.get_style_context().remove_class('gtkdm-warning')
-                self.get_style_context().add_class('gtkdm-critical')
-            elif alarm == gepics.Alarm.MINOR:
-                self.get_style_context().add_class('gtkdm-warning')
-                self.get_style_context().remove_class('gtkdm-critical')
-            else:
-                self.get_style_context().remove_class('gtkdm-warning')
-                self.get_style_context().remove_class('gtkdm-critical')
-            self.queue_draw()
+            if alarm == self.alarm_state:
+                StyleBatch.avoided += 1
+                return
+            self.alarm_state = alarm
+            StyleBatch.update(self, alarm_classes(alarm))
 
 
 class ActiveMixin(object):
     PV_COPY_BUTTON = 2
+    active_state = None
+    copy_text = None
 
     def on_active(self, pv, connected):
-        self.copy_text = pv.name
-        self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
-        self.connect("button-press-event", self.on_mouse_press)
-        self.set_tooltip_text(self.copy_text)
+        if self.active_state is None:
+            self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
+            self.connect("button-press-event", self.on_mouse_press)
+        if self.copy_text != pv.name:
+            self.copy_text = pv.name
+            self.set_tooltip_text(self.copy_text)
         if connected:
             try:
                 self.ctrlvars = pv.get_with_metadata(with_ctrlvars=True)
             except ChannelAccessGetFailure:
                 self.ctrlvars = {}
-            self.get_style_context().remove_class('gtkdm-inactive')
-            self.set_sensitive(True)
-        else:
-            self.get_style_context().add_class('gtkdm-inactive')
-            self.set_sensitive(False)
+        if connected == self.active_state:
+            StyleBatch.avoided += 1
+            return
+        self.active_state = connected
+        StyleBatch.update(self, {'gtkdm-inactive': not connected})
+        self.set_sensitive(connected)
         self.queue_draw()
 
     def on_mouse_press(self, widget, event):
@@ -341,7 +1051,7 @@ class ActiveMixin(object):
                 self.PV_COPY_BUTTON == 2,
                 self.PV_COPY_BUTTON == 1 and event.type == Gdk.EventType._2BUTTON_PRESS
             )
-            if any(valid) and hasattr(self, 'copy_text'):
+            if any(valid) and self.copy_text:
                 Manager.clipboard.set_text(self.copy_text, -1)
 
 
@@ -365,11 +1075,155 @@ class FontMixin(object):
             style.add_class('bold-font')
 
 
-class Layout(Gtk.Fixed):
-    __gtype_name__ = 'Layout'
+def format_value(pv, value, prec=-1, sci=False, units=True):
+    """
+    Format a process variable value for display
+    :param pv: process variable
+    :param value: value to format
+    :param prec: precision of floating point values, -1 to use the precision of the process variable
+    :param sci: whether to use scientific format
+    :param units: whether to append the units
+    :return: text
+    """
+    if pv.type in ['enum', 'time_enum', 'ctrl_enum']:
+        text = pv.enum_strs[value]
+    elif pv.type in ['double', 'float', 'time_double', 'time_float', 'ctrl_double', 'ctrl_float']:
+        precision = prec if prec >= 0 else pv.precision
+        if precision < 0:
+            text = f'{value:g}'
+        elif sci:
+            precision += 1
+            text = f'{value:.{precision}g}'
+        else:
+            text = f'{value:.{precision}f}'
+    else:
+        text = pv.char_value
+
+    if pv.units and units:
+        text = '{} {}'.format(text, pv.units)
+    return text
+
+
+class Layout(Gtk.Fixed):
+    """
+    Fixed layout of display widgets. A virtualized layout within a scrolled window only maps the children within a
+    margin of the visible area. Children which have never been near the viewport are not realized, so they neither
+    draw nor connect to their process variables, and the channels of children scrolled far away are suspended.
+    """
+    __gtype_name__ = 'Layout'
+    dense = GObject.Property(type=bool, default=False, nick='Dense Drawing')
+    virtual = GObject.Property(type=bool, default=False, nick='Virtualized')
+    margin = GObject.Property(type=int, minimum=0, maximum=10000, default=256, nick='Viewport Margin')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.viewport = None
+        self.entries = []
+        self.rects = None
+        self.shown = None
+        self.owners = {}
+        self.pending = False
+        self.connect('realize', self.on_realize)
+
+    def on_realize(self, widget):
+        if not self.virtual or EDITOR or self.viewport is not None:
+            return
+        self.viewport = self.get_ancestor(Gtk.Viewport)
+        if self.viewport is None:
+            return
+
+        # nothing is mapped until the viewport is known
+        for child in self.get_children():
+            child.set_child_visible(False)
+        for adjustment in (self.viewport.get_hadjustment(), self.viewport.get_vadjustment()):
+            adjustment.connect('value-changed', self.queue_viewport)
+            adjustment.connect('changed', self.queue_viewport)
+        self.connect('size-allocate', self.on_children_changed)
+        self.connect('add', self.on_children_changed)
+        self.connect('remove', self.on_children_changed)
+        self.queue_viewport()
+
+    def on_children_changed(self, *args):
+        self.rects = None
+        self.owners = {}
+        self.queue_viewport()
+
+    def queue_viewport(self, *args):
+        """
+        Update the mapped children once in the next frame
+        """
+        if not self.pending:
+            self.pending = True
+            self.add_tick_callback(self.update_viewport)
+
+    def update_viewport(self, widget, clock):
+        self.pending = False
+        if self.rects is None:
+            self.entries = self.get_children()
+            rects = []
+            for child in self.entries:
+                natural = child.get_preferred_size()[1]
+                rects.append((
+                    self.child_get_property(child, 'x'), self.child_get_property(child, 'y'),
+                    natural.width, natural.height
+                ))
+            self.rects = numpy.array(rects, dtype=float).reshape(-1, 4)
+            self.shown = numpy.array([child.get_child_visible() for child in self.entries], dtype=bool)
+
+        # visible area in layout coordinates, the layout has no window of its own
+        allocation = self.get_allocation()
+        hadj, vadj = self.viewport.get_hadjustment(), self.viewport.get_vadjustment()
+        area = (
+            hadj.get_value() - allocation.x, vadj.get_value() - allocation.y, hadj.get_page_size(), vadj.get_page_size()
+        )
+        # children are shown within the margin and hidden beyond twice the margin, so that they do not flicker
+        show = self.intersecting(area, self.margin) | (self.shown & self.intersecting(area, 2 * self.margin))
+        changed = numpy.flatnonzero(show != self.shown)
+        self.shown = show
+        if len(changed):
+            for i in changed:
+                self.entries[i].set_child_visible(show[i])
+            self.suspend({self.entries[i]: not show[i] for i in changed})
+        return False
+
+    def intersecting(self, area, margin):
+        """
+        Return a boolean mask of the children intersecting an area expanded by a margin
+        """
+        x, y, width, height = area
+        rects = self.rects
+        return (
+            (rects[:, 0] < x + width + margin) & (rects[:, 0] + rects[:, 2] > x - margin) &
+            (rects[:, 1] < y + height + margin) & (rects[:, 1] + rects[:, 3] > y - margin)
+        )
+
+    def get_owners(self, child):
+        """
+        Return the widgets owning channels within a child of the layout, including the child itself. The list is
+        kept once the child is realized, since its widgets open their channels when they are realized.
+        """
+        owners = self.owners.get(child)
+        if owners is None:
+            owners = []
+            stack = [child]
+            while stack:
+                widget = stack.pop()
+                if widget in Channels.owners:
+                    owners.append(widget)
+                if isinstance(widget, Gtk.Container):
+                    stack.extend(widget.get_children())
+            if child.get_realized():
+                self.owners[child] = owners
+        return owners
+
+    def suspend(self, children):
+        """
+        Suspend or resume the channels owned by children of the layout and their descendants
+        :param children: dictionary mapping children to True to suspend or False to resume
+        """
+        for child, suspended in children.items():
+            for owner in self.get_owners(child):
+                Channels.suspend(owner, suspended)
 
 
 class DisplayWindow(Gtk.Window):
@@ -524,7 +1378,7 @@ class TextMonitor(FontMixin, ActiveMixin, AlarmMixin, Gtk.EventBox):
     def on_realize(self, obj):
         self.palette = ColorSequence(self.colors)
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
@@ -532,22 +1386,7 @@ class TextMonitor(FontMixin, ActiveMixin, AlarmMixin, Gtk.EventBox):
         super().on_realize(obj)
 
     def on_change(self, pv, value):
-        if pv.type in ['enum', 'time_enum', 'ctrl_enum']:
-            text = pv.enum_strs[value]
-        elif pv.type in ['double', 'float', 'time_double', 'time_float', 'ctrl_double', 'ctrl_float']:
-            precision = self.prec if self.prec >= 0 else pv.precision
-            if precision < 0:
-                text = f'{value:g}'
-            elif self.sci:
-                precision += 1
-                text = f'{value:.{precision}g}'
-            else:
-                text = f'{value:.{precision}f}'
-        else:
-            text = pv.char_value
-
-        if self.pv.units and self.show_units:
-            text = '{} {}'.format(text, pv.units)
+        text = format_value(pv, value, prec=self.prec, sci=self.sci, units=self.show_units)
         if self.colors:
             text = '<span color="{}">{}</span>'.format(self.palette[value], text)
         self.label.set_markup(text)
@@ -614,13 +1453,13 @@ class TextPanel(FontMixin, ActiveMixin, AlarmMixin, Gtk.EventBox):
     def on_realize(self, obj):
         self.palette = ColorSequence(self.colors)
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
 
             if not self.label:
-                self.label_pv = gepics.PV('{}.DESC'.format(self.channel))
+                self.label_pv = Channels.open(self, '{}.DESC'.format(self.channel))
                 self.label_pv.connect('changed', self.on_label_change)
         super().on_realize(obj)
 
@@ -691,6 +1530,7 @@ class DateLabel(FontMixin, Gtk.Bin):
         self.label = Gtk.Label(label='')
         self.bind_property('xalign', self.label, 'xalign', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
         self.add(self.label)
+        self.tick = None
         self.connect('realize', self.on_realize)
 
     def update(self):
@@ -699,11 +1539,13 @@ class DateLabel(FontMixin, Gtk.Bin):
 
     def on_realize(self, obj):
         self.update()
-        GLib.timeout_add(1000. / self.refresh, self.update)
+        if self.tick:
+            Clock.unsubscribe(self.tick)
+        self.tick = Clock.subscribe(1. / self.refresh, self.update, owner=self)
         super().on_realize(obj)
 
 
-class LineMonitor(ActiveMixin, AlarmMixin, BlankWidget):
+class LineMonitor(ThemeMixin, ActiveMixin, AlarmMixin, BlankWidget):
     __gtype_name__ = 'LineMonitor'
     channel = GObject.Property(type=str, default='', nick='PV Name')
     line_width = GObject.Property(type=float, minimum=0.1, maximum=100.0, default=1.0, nick='Width')
@@ -745,10 +1587,7 @@ class LineMonitor(ActiveMixin, AlarmMixin, BlankWidget):
         # draw line
         x1, y1, x2, y2 = self.get_coords()
 
-        if not self.color:
-            self.props.color = self.get_style_context().get_color(Gtk.StateFlags.NORMAL)
-
-        cr.set_source_rgba(*self.color)
+        cr.set_source_rgba(*(self.color or self.get_theme()['foreground']))
         cr.set_line_width(self.line_width)
 
         cr.move_to(x1, y1)  # top left of the widget
@@ -776,7 +1615,7 @@ class LineMonitor(ActiveMixin, AlarmMixin, BlankWidget):
         self.palette = ColorSequence(self.colors)
 
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
@@ -785,7 +1624,7 @@ class LineMonitor(ActiveMixin, AlarmMixin, BlankWidget):
         self.color = self.palette(int(value))
 
 
-class Byte(ActiveMixin, AlarmMixin, BlankWidget):
+class Byte(ThemeMixin, ActiveMixin, AlarmMixin, BlankWidget):
     __gtype_name__ = 'Byte'
     channel = GObject.Property(type=str, default='', nick='PV Name')
     offset = GObject.Property(type=int, minimum=0, maximum=4, default=0, nick='Byte Offset')
@@ -804,7 +1643,6 @@ class Byte(ActiveMixin, AlarmMixin, BlankWidget):
         self._view_labels = [''] * self.count
 
         self.theme = {
-            'border': Gdk.RGBA(red=0.0, green=0.0, blue=0.0, alpha=1.0),
             'fill': Gdk.RGBA(red=1.0, green=1.0, blue=1.0, alpha=1.0),
         }
         self.connect('realize', self.on_realize)
@@ -816,20 +1654,16 @@ class Byte(ActiveMixin, AlarmMixin, BlankWidget):
         col_width = allocation.width / self.columns
 
         # draw boxes
-        style = self.get_style_context()
-        self.theme['label'] = style.get_color(style.get_state())
+        self.theme['label'] = self.get_theme()['foreground']
+        border = self.get_theme()['border'].to_string()
+        scale = self.get_scale_factor()
 
-        cr.set_line_width(0.75)
         margin = 4
         for i in range(self.count):
             x = pix((i // stride) * col_width + margin)
             y = pix(margin + (i % stride) * (self.size + 5))
-            cr.rectangle(x, y, self.size, self.size)
-            color = self.palette(int(self._view_bits[i]))
-            cr.set_source_rgba(*color)
-            cr.fill_preserve()
-            cr.set_source_rgba(*self.theme['border'])
-            cr.stroke()
+            sprite = LEDSprites.get(self.size, self.palette.spec(int(self._view_bits[i])), border, scale)
+            LEDSprites.blit(cr, sprite, x, y, self.size)
 
             if i < len(self._view_labels):
                 cr.set_source_rgba(*self.theme['label'])
@@ -849,7 +1683,7 @@ class Byte(ActiveMixin, AlarmMixin, BlankWidget):
         labels = [v.strip() for v in self.labels.split(',')]
         self._view_labels = labels + (self.count - len(labels)) * ['']
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
@@ -863,7 +1697,7 @@ class Byte(ActiveMixin, AlarmMixin, BlankWidget):
         self.queue_draw()
 
 
-class Indicator(ActiveMixin, AlarmMixin, BlankWidget):
+class Indicator(ThemeMixin, ActiveMixin, AlarmMixin, BlankWidget):
     __gtype_name__ = 'Indicator'
     channel = GObject.Property(type=str, default='', nick='PV Name')
     label = GObject.Property(type=str, default='', nick='Label')
@@ -879,22 +1713,18 @@ class Indicator(ActiveMixin, AlarmMixin, BlankWidget):
         self.label_pv = None
         self.palette = ColorSequence(self.colors)
         self.theme = {
-            'border': Gdk.RGBA(red=0.0, green=0.0, blue=0.0, alpha=1.0),
             'fill': self.palette(0),
         }
         self.set_sensitive(False)
         self.connect('realize', self.on_realize)
 
     def do_draw(self, cr):
-        style = self.get_style_context()
-        cr.set_line_width(0.75)
         margin = 4.5
-        self.theme['label'] = style.get_color(style.get_state())
-        cr.set_source_rgba(*self.theme['fill'])
-        cr.rectangle(margin, margin, self.size, self.size)
-        cr.fill_preserve()
-        cr.set_source_rgba(*self.theme['border'])
-        cr.stroke()
+        self.theme['label'] = self.get_theme()['foreground']
+        sprite = LEDSprites.get(
+            self.size, self.theme['fill'].to_string(), self.get_theme()['border'].to_string(), self.get_scale_factor()
+        )
+        LEDSprites.blit(cr, sprite, margin, margin, self.size)
 
         cr.set_source_rgba(*self.theme['label'])
         layout = self.create_pango_layout(self.label)
@@ -905,13 +1735,13 @@ class Indicator(ActiveMixin, AlarmMixin, BlankWidget):
     def on_realize(self, widget):
         self.palette = ColorSequence(self.colors)
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
 
             if not self.label:
-                self.label_pv = gepics.PV('{}.DESC'.format(self.channel))
+                self.label_pv = Channels.open(self, '{}.DESC'.format(self.channel))
                 self.label_pv.connect('changed', self.on_label_change)
 
     def on_label_change(self, pv, value):
@@ -983,7 +1813,7 @@ class ScaleControl(FontMixin, ActiveMixin, AlarmMixin, Gtk.EventBox):
         self.scale.props.value_pos = value_pos
         self.update_marks()
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
@@ -1032,7 +1862,7 @@ class TweakControl(ActiveMixin, AlarmMixin, Gtk.EventBox):
 
     def on_realize(self, obj):
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
@@ -1075,13 +1905,14 @@ class TextControl(ActiveMixin, AlarmMixin, Gtk.EventBox):
         self.in_progress = False
         self.restore_src = None
         self.pv = None
+        self.connect('destroy', self.disable_restore)
         self.add(self.entry)
         self.get_style_context().add_class('gtkdm')
         self.set_sensitive(False)
 
     def on_realize(self, obj):
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
@@ -1172,6 +2003,8 @@ class TextEntryMonitor(ActiveMixin, Gtk.Box):
             'feedback': False,
         }
         self.restore_src = None
+        self.alarm_states = {}
+        self.connect('destroy', self.disable_restore)
 
         ctx = self.get_style_context()
         ctx.add_class('gtkdm')
@@ -1182,27 +2015,21 @@ class TextEntryMonitor(ActiveMixin, Gtk.Box):
 
     def on_alarm(self, pv, alarm, name):
         if self.alarm:
-            widget = self.entries[name]
-            if alarm == gepics.Alarm.MAJOR:
-                widget.get_style_context().remove_class('gtkdm-warning')
-                widget.get_style_context().add_class('gtkdm-critical')
-            elif alarm == gepics.Alarm.MINOR:
-                widget.get_style_context().add_class('gtkdm-warning')
-                widget.get_style_context().remove_class('gtkdm-critical')
-            else:
-                widget.get_style_context().remove_class('gtkdm-warning')
-                widget.get_style_context().remove_class('gtkdm-critical')
-            widget.queue_draw()
+            if alarm == self.alarm_states.get(name):
+                StyleBatch.avoided += 1
+                return
+            self.alarm_states[name] = alarm
+            StyleBatch.update(self.entries[name], alarm_classes(alarm))
 
     def on_realize(self, obj):
         if not EDITOR:
             if self.tgt_channel and (not self.fbk_channel or self.tgt_channel == self.fbk_channel):
-                pv = gepics.PV(self.tgt_channel)
+                pv = Channels.open(self, self.tgt_channel)
                 self.pv['target'] = pv
                 self.pv['feedback'] = pv
             elif self.tgt_channel and self.fbk_channel:
-                self.pv['target'] = gepics.PV(self.tgt_channel)
-                self.pv['feedback'] = gepics.PV(self.fbk_channel)
+                self.pv['target'] = Channels.open(self, self.tgt_channel)
+                self.pv['feedback'] = Channels.open(self, self.fbk_channel)
             else:
                 return
 
@@ -1288,11 +2115,11 @@ class CommandButton(ActiveMixin, AlarmMixin, Gtk.EventBox):
 
     def on_realize(self, obj):
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('active', self.on_active)
 
             if not (self.label or self.icon_name):
-                self.label_pv = gepics.PV('{}.DESC'.format(self.channel))
+                self.label_pv = Channels.open(self, '{}.DESC'.format(self.channel))
                 self.label_pv.connect('changed', self.on_label_change)
             else:
                 if self.icon_name:
@@ -1375,11 +2202,11 @@ class OnOffButton(ActiveMixin, AlarmMixin, Gtk.EventBox):
         }
         self.button.set_label(self.on_label)
         if not EDITOR:
-            self.state_pv = gepics.PV(self.state_channel)
+            self.state_pv = Channels.open(self, self.state_channel)
             self.state_pv.connect('changed', self.on_state_change)
             self.state_pv.connect('active', self.on_active)
             for state, spec in self.registry.items():
-                spec['pv'] = gepics.PV(spec['channel'])
+                spec['pv'] = Channels.open(self, spec['channel'])
 
 
 class OnOffSwitch(ActiveMixin, AlarmMixin, Gtk.Bin):
@@ -1444,11 +2271,11 @@ class OnOffSwitch(ActiveMixin, AlarmMixin, Gtk.Bin):
             },
         }
         if not EDITOR:
-            self.state_pv = gepics.PV(self.state_channel)
+            self.state_pv = Channels.open(self, self.state_channel)
             self.state_pv.connect('changed', self.on_state_change)
             self.state_pv.connect('active', self.on_active)
             for state, spec in self.registry.items():
-                spec['pv'] = gepics.PV(spec['channel'])
+                spec['pv'] = Channels.open(self, spec['channel'])
 
 
 class MessageButton(CommandButton):
@@ -1507,7 +2334,7 @@ class ChoiceButton(ActiveMixin, AlarmMixin, Gtk.EventBox):
             self.menu_labels = [v.strip() for v in re.split(r'[,|;]', self.labels)]
 
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('active', self.on_active)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('changed', self.on_change)
@@ -1571,7 +2398,7 @@ class ChoiceMenu(ActiveMixin, Gtk.EventBox):
         if self.labels.strip():
             self.menu_labels = [v.strip() for v in re.split(r'[,|;]', self.labels)]
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect_after('active', self.on_active)
             self.pv.connect('changed', self.on_change)
 
@@ -1622,7 +2449,7 @@ class ShellButton(Gtk.Bin):
                 self.proc = subprocess.Popen(cmds, shell=True, stdout=subprocess.DEVNULL)
 
 
-class Gauge(ActiveMixin, BlankWidget):
+class Gauge(ThemeMixin, ActiveMixin, BlankWidget):
     __gtype_name__ = 'Gauge'
     channel = GObject.Property(type=str, default='', nick='PV Name')
     angle = GObject.Property(type=int, minimum=90, maximum=335, default=270, nick='Angle')
@@ -1652,13 +2479,12 @@ class Gauge(ActiveMixin, BlankWidget):
         y = allocation.height / 2
         r = 4 * x / 6
 
-        style = self.get_style_context()
-        color = style.get_color(style.get_state())
+        color = self.get_theme()['foreground']
         cr.set_source_rgba(*color)
         cr.set_line_width(0.75)
 
-        minimum = (self.minimum // self.step) * self.step
-        maximum = ceil(self.maximum // self.step) * self.step
+        axis = AxisEngine.ticks(self.minimum, self.maximum, self.step, self.ticks)
+        minimum, maximum = axis.minimum, axis.maximum
 
         half_angle = self.angle / 2
         start_angle = radians(270 - half_angle)
@@ -1674,9 +2500,6 @@ class Gauge(ActiveMixin, BlankWidget):
         r1 = r - tick_width / 2
         r0 = r + tick_width / 2
 
-        major = ticks(minimum, maximum, self.step)
-        minor = ticks(minimum, maximum, self.step / (self.ticks + 1))
-
         # levels
         cr.set_line_width(2)
         rl = 2 * r / 3
@@ -1709,19 +2532,21 @@ class Gauge(ActiveMixin, BlankWidget):
 
         # ticks
         cr.set_line_width(0.75)
-        for tick in set(minor + major):
-            is_major = tick in major
-            tick_angle = angle_scale * (tick - minimum) + start_angle
+        values = numpy.concatenate((axis.major, axis.minor))
+        angles = angle_scale * (values - minimum) + start_angle
+        cosines, sines = numpy.cos(angles), numpy.sin(angles)
+        for i, tick in enumerate(values):
+            is_major = i < len(axis.major)
             rt2 = r0 if is_major else r
-            tx1 = x + r1 * cos(tick_angle)
-            ty1 = y + r1 * sin(tick_angle)
-            tx2 = x + rt2 * cos(tick_angle)
-            ty2 = y + rt2 * sin(tick_angle)
+            tx1 = x + r1 * cosines[i]
+            ty1 = y + r1 * sines[i]
+            tx2 = x + rt2 * cosines[i]
+            ty2 = y + rt2 * sines[i]
 
             cr.set_source_rgba(*color)
             if is_major:
-                tx3 = x + rt * cos(tick_angle)
-                ty3 = y + rt * sin(tick_angle)
+                tx3 = x + rt * cosines[i]
+                ty3 = y + rt * sines[i]
                 label = '{:g}'.format(tick)
                 xb, yb, tw, th = cr.text_extents(label)[:4]
                 cr.move_to(tx3 - xb - tw / 2, ty3 - yb - th / 2)
@@ -1770,12 +2595,12 @@ class Gauge(ActiveMixin, BlankWidget):
     def on_realize(self, widget):
         self.palette = ColorSequence(self.colors)
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('active', self.on_active)
 
             if not self.label:
-                self.label_pv = gepics.PV('{}.DESC'.format(self.channel))
+                self.label_pv = Channels.open(self, '{}.DESC'.format(self.channel))
                 self.label_pv.connect('changed', self.on_label_change)
 
     def on_label_change(self, pv, value):
@@ -1797,56 +2622,316 @@ class Gauge(ActiveMixin, BlankWidget):
         super().on_active(pv, connected)
 
 
-class SymbolFrames(object):
-    registry = {}
+RawFrame = collections.namedtuple('RawFrame', 'data width height rowstride')
+
+
+def decode_frame(source):
+    """
+    Create a pixbuf from an encoded image or a raw RGBA frame
+    :param source: encoded image bytes or RawFrame
+    """
+    if isinstance(source, RawFrame):
+        # GLib.Bytes always copies its data, mapped frames are only read from disk once they are decoded
+        data = source.data if isinstance(source.data, bytes) else source.data.tobytes()
+        return GdkPixbuf.Pixbuf.new_from_bytes(
+            GLib.Bytes.new(data), GdkPixbuf.Colorspace.RGB, True, 8, source.width, source.height, source.rowstride
+        )
+    else:
+        stream = Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(source))
+        return GdkPixbuf.Pixbuf.new_from_stream(stream, None)
+
+
+def stored_offset(data, info):
+    """
+    Return the offset of the contents of an uncompressed zip archive member within the archive
+    :param data: archive bytes or memory map
+    :param info: zipfile.ZipInfo of the member
+    """
+    name_length, extra_length = struct.unpack('<HH', data[info.header_offset + 26:info.header_offset + 30])
+    return info.header_offset + 30 + name_length + extra_length
+
+
+def image_size(data):
+    """
+    Determine the dimensions of an encoded image, decoding as little of it as possible
+    :param data: encoded image bytes
+    :return: (width, height) tuple, (0, 0) if the size could not be determined
+    """
+    size = []
+    loader = GdkPixbuf.PixbufLoader()
+    loader.connect('size-prepared', lambda obj, width, height: size.extend((width, height)))
+    try:
+        for i in range(0, len(data), 4096):
+            loader.write(data[i:i + 4096])
+            if size:
+                break
+        loader.close()
+    except GLib.Error:
+        pass  # closing a partially written loader is expected to fail
+    return tuple(size[:2]) if size else (0, 0)
 
-    def __init__(self, path=None):
+
+class SymbolFrames(object):
+    """
+    Frames of a symbol file. The archive is read once and frames are decoded lazily on first use. Uncompressed raw
+    frames of version 2 archives are memory mapped, so that they are only read from disk when they are decoded,
+    and archives with prerendered sizes stay open to read them on demand. Loaded symbols are kept in a registry
+    bounded by a memory budget, and symbols still used by widgets are found even after they have been evicted from
+    it. Symbol files are loaded on the worker threads.
+    """
+    registry = utils.LRUCache(128 * 1024 * 1024, sizeof=lambda frames: frames.nbytes)
+    surfaces = utils.LRUCache(64 * 1024 * 1024, sizeof=lambda surface: surface.get_stride() * surface.get_height())
+    live = weakref.WeakValueDictionary()
+    loading = {}
+    lock = threading.Lock()
+
+    def __init__(self, path=None, data=None):
+        self.path = path
         self.frames = []
+        self.sources = []
+        self.prerendered = []
+        self.values = {}
+        self.version = 1
+        self.mapping = None
+        self.archive = None
         self.width = 0
         self.height = 0
-        if path:
+        self.nbytes = 0
+        self.decode_lock = threading.Lock()
+        if data is not None:
+            self.load_symbol_file(io.BytesIO(data))
+        elif path:
             self.load_symbol_file(path)
 
-    def load_symbol_file(self, path):
-        with zipfile.ZipFile(path, 'r') as sym:
+    def load_symbol_file(self, source):
+        """
+        Read the symbol archive and determine frame dimensions without decoding the frames
+        :param source: path or file-like object of the symbol archive
+        """
+        sym = zipfile.ZipFile(source, 'r')
+        try:
             index = json.loads(sym.read('symbol.json'))
-            for frame in index:
-                data = sym.read(frame)
-                if frame.endswith('.sym'):  # nested symbols for animation
-                    self.frames.append(SymbolFrames.new_from_data(data, os.path.join(path, frame)))
+            if isinstance(index, dict):
+                self.load_metadata(sym, index, source)
+            else:
+                self.load_frames(sym, index)
+        finally:
+            if self.archive is not sym:
+                sym.close()
+
+    def load_frames(self, sym, index):
+        """
+        Read a version 1 symbol archive, which lists the frame files in its symbol.json
+        :param sym: open zipfile.ZipFile
+        :param index: parsed symbol.json list of frame file names
+        """
+        for frame in index:
+            data = sym.read(frame)
+            self.nbytes += len(data)
+            self.prerendered.append({})
+            if frame.endswith('.sym'):  # nested symbols for animation, read from the in-memory archive
+                self.sources.append(None)
+                self.frames.append(SymbolFrames.new_from_data(data, os.path.join(self.path or '', frame)))
+            else:
+                self.sources.append(data)
+                self.frames.append(None)
+                width, height = image_size(data)
+                if not (width and height):
+                    # size not available from the header, decode the frame now
+                    pixbuf = self.get_frame(len(self.frames) - 1)
+                    width, height = pixbuf.get_width(), pixbuf.get_height()
+                self.width = max(self.width, width)
+                self.height = max(self.height, height)
+                self.nbytes += width * height * 4
+
+    def load_metadata(self, sym, index, source):
+        """
+        Read a version 2 symbol archive, which describes frame dimensions, value mapping, raw frames and
+        prerendered sizes in its symbol.json
+        :param sym: open zipfile.ZipFile
+        :param index: parsed symbol.json dictionary
+        :param source: path or file-like object of the symbol archive
+        """
+        self.version = index.get('version', 2)
+        self.width = index.get('width', 0)
+        self.height = index.get('height', 0)
+        self.values = {int(k): v for k, v in index.get('values', {}).items()}
+        if any(frame.get('sizes') for frame in index['frames']):
+            self.archive = sym  # kept open to read prerendered sizes on demand
+        if isinstance(source, str) and any('raw' in frame for frame in index['frames']):
+            with open(source, 'rb') as handle:
+                self.mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        for frame in index['frames']:
+            name = frame['file']
+            self.prerendered.append({
+                tuple(int(v) for v in size.split('x')): entry for size, entry in frame.get('sizes', {}).items()
+            })
+            if name.endswith('.sym'):
+                data = sym.read(name)
+                self.nbytes += len(data)
+                self.sources.append(None)
+                self.frames.append(SymbolFrames.new_from_data(data, os.path.join(self.path or '', name)))
+                continue
+
+            width = frame.get('width', self.width)
+            height = frame.get('height', self.height)
+            raw = sym.getinfo(frame['raw']) if 'raw' in frame else None
+            if raw and raw.compress_type == zipfile.ZIP_STORED:
+                if self.mapping:
+                    offset = stored_offset(self.mapping, raw)
+                    data = memoryview(self.mapping)[offset:offset + raw.file_size]
                 else:
-                    stream = Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(data))
-                    pixbuf = GdkPixbuf.Pixbuf.new_from_stream(stream, None)
-                    self.width = max(self.width, pixbuf.get_width())
-                    self.height = max(self.height, pixbuf.get_height())
-                    self.frames.append(pixbuf)
+                    data = sym.read(raw)
+                self.sources.append(RawFrame(data, width, height, frame['rowstride']))
+            else:
+                data = sym.read(name)
+                self.nbytes += len(data)
+                self.sources.append(data)
+            self.frames.append(None)
+            self.nbytes += width * height * 4
+
+    def get_frame(self, index):
+        """
+        Return the frame at the given index, decoding it on first use
+        """
+        frame = self.frames[index]
+        if frame is None and self.sources[index] is not None:
+            with self.decode_lock:
+                frame = self.frames[index]
+                if frame is None:
+                    frame = decode_frame(self.sources[index])
+                    self.frames[index] = frame
+                    self.sources[index] = None
+        return frame
 
     @classmethod
-    def new_from_file(cls, path):
+    def new_from_file(cls, path, callback, *args):
+        """
+        Get the frames of a symbol file without blocking. The callback is called right away if the symbol is already
+        loaded, otherwise from the main loop once it has been loaded on the worker threads.
+        :param path: symbol file path
+        :param callback: callable taking the SymbolFrames, or None if the file could not be loaded, and the args
+        :param args: extra arguments for the callback
+        """
         full_path = os.path.abspath(path)
-        if full_path in cls.registry:
-            return cls.registry[full_path]
+        with cls.lock:
+            sf = cls.live.get(full_path) or cls.registry.get(full_path)
+            future = cls.load(full_path) if sf is None else None
+        if sf is None:
+            future.add_done_callback(lambda f: GLib.idle_add(cls.on_loaded, f, callback, *args))
+        else:
+            cls.live[full_path] = sf
+            callback(sf, *args)
+
+    @classmethod
+    def on_loaded(cls, future, callback, *args):
+        try:
+            sf = future.result()
+        except Exception as e:
+            logger.error('Symbol File {} could not be loaded: {}'.format(future.path, e))
+            sf = None
         else:
-            sf = SymbolFrames(full_path)
-            cls.registry[full_path] = sf
-            return sf
+            cls.live[sf.path] = sf
+        callback(sf, *args)
+        return False
 
     @classmethod
     def new_from_data(cls, data, path):
         full_path = os.path.abspath(path)
-        if full_path in cls.registry:
-            return cls.registry[full_path]
+        sf = cls.registry.get(full_path)
+        if sf is None:
+            sf = SymbolFrames(full_path, data=data)
+            cls.registry.put(full_path, sf)
+        return sf
+
+    @classmethod
+    def prefetch(cls, paths):
+        """
+        Load symbol files in parallel on the worker threads
+        :param paths: sequence of symbol file paths
+        """
+        for path in paths:
+            full_path = os.path.abspath(path)
+            with cls.lock:
+                if full_path not in cls.registry and full_path not in cls.live:
+                    cls.load(full_path)
+
+    @classmethod
+    def load(cls, full_path):
+        """
+        Return the future of a symbol file being loaded on the worker threads, starting to load it if necessary.
+        The future is registered before the load is submitted, so that concurrent requests share it. Must be called
+        with the lock held.
+        :param full_path: absolute symbol file path
+        """
+        future = cls.loading.get(full_path)
+        if future is None:
+            future = cls.loading[full_path] = Future()
+            future.path = full_path
+            WORKERS.submit(cls.load_in_background, future)
+        return future
+
+    @classmethod
+    def load_in_background(cls, future):
+        try:
+            sf = SymbolFrames(future.path)
+            cls.registry.put(future.path, sf)
+        except Exception as e:
+            future.set_exception(e)
         else:
-            sf = SymbolFrames(full_path)
-            cls.registry[full_path] = sf
-            return sf
+            future.set_result(sf)
+        finally:
+            with cls.lock:
+                cls.loading.pop(future.path, None)
+
+    def get_index(self, value):
+        """
+        Return the frame index for a value, or None if there is no frame for it
+        """
+        index = self.values.get(int(value), int(value))
+        if 0 <= abs(index) < len(self.frames):
+            return index % len(self.frames)
 
     def __call__(self, value):
-        if 0 <= abs(int(value)) < len(self.frames):
-            return self.frames[int(value)]
+        index = self.get_index(value)
+        if index is not None:
+            return self.get_frame(index)
+
+    def get_surface(self, value, width, height, scale=1):
+        """
+        Return the frame for the given value as a cairo surface of the given size, ready for painting.
+        Scaled frames are kept in an LRU cache shared by all symbols using the same file.
+
+        :param value: frame value
+        :param width: target width in logical pixels
+        :param height: target height in logical pixels
+        :param scale: widget scale factor
+        :return: cairo.ImageSurface or None if there is no image frame for the value
+        """
+        image = self(value)
+        if not isinstance(image, GdkPixbuf.Pixbuf):
+            return None
+
+        index = self.get_index(value)
+        key = (self.path, index, width, height, scale)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            target = (width * scale, height * scale)
+            # scale down from the smallest prerendered size that is large enough, if any
+            sizes = sorted(size for size in self.prerendered[index] if size[0] >= target[0] and size[1] >= target[1])
+            if sizes:
+                image = decode_frame(self.archive.read(self.prerendered[index][sizes[0]]))
+            if (image.get_width(), image.get_height()) == target:
+                pixbuf = image
+            else:
+                pixbuf = image.scale_simple(*target, GdkPixbuf.InterpType.BILINEAR)
+            surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale, None)
+            self.surfaces.put(key, surface)
+        return surface
 
 
-class Symbol(ActiveMixin, BlankWidget):
+class Symbol(ThemeMixin, ActiveMixin, BlankWidget):
     __gtype_name__ = 'Symbol'
     channel = GObject.Property(type=str, default='', nick='PV Name')
     file = GObject.Property(type=str, nick='Symbol File')
@@ -1856,6 +2941,7 @@ class Symbol(ActiveMixin, BlankWidget):
         super().__init__(*args, **kwargs)
         self.frames = None
         self.image = None
+        self.value = -1
         self.connect('realize', self.on_realize)
 
     def do_draw(self, cr):
@@ -1864,66 +2950,141 @@ class Symbol(ActiveMixin, BlankWidget):
         y = allocation.height / 2
         if self.image:
             scale = min(allocation.width / self.frames.width, allocation.height / self.frames.height)
-            w = self.image.get_width() * scale
-            h = self.image.get_height() * scale
-            pixbuf = self.image.scale_simple(w, h, GdkPixbuf.InterpType.BILINEAR)
-            if self.angle != 0:
-                cr.translate(x, y)
-                cr.rotate(self.angle * pi / 180.0)
-                cr.translate(-x, -y)
-            Gdk.cairo_set_source_pixbuf(cr, pixbuf, x - w / 2, y - h / 2)
-            cr.paint()
+            w = max(1, round(self.image.get_width() * scale))
+            h = max(1, round(self.image.get_height() * scale))
+            surface = self.frames.get_surface(self.value, w, h, self.get_scale_factor())
+            if surface:
+                if self.angle != 0:
+                    cr.translate(x, y)
+                    cr.rotate(self.angle * pi / 180.0)
+                    cr.translate(-x, -y)
+                cr.set_source_surface(surface, x - w / 2, y - h / 2)
+                cr.paint()
         else:
             # draw boxes
-            style = self.get_style_context()
-            color = style.get_color(style.get_state())
-            cr.set_source_rgba(*color)
+            cr.set_source_rgba(*self.get_theme()['foreground'])
             cr.rectangle(1.5, 1.5, allocation.width - 3, allocation.height - 3)
             cr.stroke()
 
     def on_realize(self, widget):
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('active', self.on_active)
 
         if self.file:
             symbol_path = Manager.find_display(self.file)
-            self.frames = SymbolFrames.new_from_file(symbol_path)
-            self.image = self.frames(-1)
+            if symbol_path:
+                SymbolFrames.new_from_file(symbol_path, self.on_frames)
+            else:
+                logger.error('Symbol File {} not found'.format(self.file))
+
+    def on_frames(self, frames):
+        if frames:
+            self.frames = frames
+            self.image = self.frames(self.value)
+            self.queue_draw()
 
     def on_change(self, pv, value):
-        self.image = self.frames(value)
+        self.value = value
+        if self.frames:
+            self.image = self.frames(value)
         self.queue_draw()
 
 
-class Diagram(BlankWidget):
+class Diagram(ThemeMixin, BlankWidget):
+    """
+    A static image. Images are loaded and rasterized at the allocated size on a worker thread and cached per size
+    and scale factor, so that only a ready surface is ever painted on the main thread.
+    """
     __gtype_name__ = 'Diagram'
     pixbuf = GObject.Property(type=GdkPixbuf.Pixbuf, nick='Image File')
+    file = GObject.Property(type=str, default='', nick='Image Path')
+
+    surfaces = utils.LRUCache(128 * 1024 * 1024, sizeof=lambda surface: surface.get_stride() * surface.get_height())
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.source = None
+        self.surface = None
+        self.pending = None
+        self.connect('realize', self.on_realize)
+
+    def on_realize(self, widget):
+        if self.file:
+            if os.path.exists(self.file):
+                self.source = os.path.abspath(self.file)
+            else:
+                self.source = Manager.find_display(self.file)
+            if not self.source:
+                logger.error('Image File {} not found'.format(self.file))
+
+    @staticmethod
+    def render_surface(source, width, height, scale):
+        """
+        Rasterize an image file or pixbuf to fit the given size. Called from a worker thread.
+
+        :param source: image file path or GdkPixbuf.Pixbuf
+        :param width: target width in logical pixels
+        :param height: target height in logical pixels
+        :param scale: widget scale factor
+        :return: cairo.ImageSurface
+        """
+        if isinstance(source, str):
+            # vector images are rendered directly at the target resolution
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(source, width * scale, height * scale, True)
+        else:
+            factor = min(width * scale / source.get_width(), height * scale / source.get_height())
+            pixbuf = source.scale_simple(
+                max(1, round(source.get_width() * factor)), max(1, round(source.get_height() * factor)),
+                GdkPixbuf.InterpType.BILINEAR
+            )
+        return Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale, None)
+
+    def rasterize(self, key):
+        if self.pending:
+            return
+        self.pending = key
+        future = WORKERS.submit(self.render_surface, *key)
+        future.add_done_callback(lambda f: GLib.idle_add(self.on_rasterized, key, f))
+
+    def on_rasterized(self, key, future):
+        self.pending = None
+        try:
+            surface = future.result()
+        except (GLib.Error, OSError) as e:
+            logger.error('Unable to load image {}: {}'.format(self.file, e))
+            self.source = None
+        else:
+            self.surfaces.put(key, surface)
+            self.surface = surface
+        self.queue_draw()
+        return False
 
     def do_draw(self, cr):
         allocation = self.get_allocation()
-        x = allocation.width / 2
-        y = allocation.height / 2
-        if self.pixbuf:
-            scale = min(allocation.width / self.pixbuf.get_width(), allocation.height / self.pixbuf.get_height())
+        source = self.source or self.pixbuf
+        if source and allocation.width > 1 and allocation.height > 1:
+            key = (source, allocation.width, allocation.height, self.get_scale_factor())
+            surface = self.surfaces.get(key)
+            if surface is None:
+                self.rasterize(key)
+            else:
+                self.surface = surface
+
+        if self.surface:
+            # until a surface for the current size is ready, the last one is stretched as a placeholder
+            width, height = surface_size(self.surface)
+            scale = min(allocation.width / width, allocation.height / height)
             cr.save()
+            cr.translate(allocation.width / 2, allocation.height / 2)
             cr.scale(scale, scale)
-            Gdk.cairo_set_source_pixbuf(
-                cr, self.pixbuf,
-                x - self.pixbuf.get_width() * scale / 2,
-                y - self.pixbuf.get_height() * scale / 2
-            )
+            cr.set_source_surface(self.surface, -width / 2, -height / 2)
             cr.paint()
             cr.restore()
         else:
             # draw boxes
-            style = self.get_style_context()
-            color = style.get_color(style.get_state())
-            cr.set_source_rgba(*color)
+            cr.set_source_rgba(*self.get_theme()['foreground'])
             cr.rectangle(1.5, 1.5, allocation.width - 3, allocation.height - 3)
             cr.stroke()
 
@@ -1952,13 +3113,13 @@ class CheckControl(ActiveMixin, AlarmMixin, Gtk.EventBox):
 
     def on_realize(self, obj):
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
 
             if not self.label:
-                self.label_pv = gepics.PV('{}.DESC'.format(self.channel))
+                self.label_pv = Channels.open(self, '{}.DESC'.format(self.channel))
                 self.label_pv.connect('changed', self.on_label_change)
 
     def on_label_change(self, pv, value):
@@ -2000,7 +3161,7 @@ class DisplayButton(Gtk.Bin):
                 Manager.show_display(self.display, macros_spec=self.macros, multiple=self.multiple)
 
 
-class Shape(ActiveMixin, AlarmMixin, BlankWidget):
+class Shape(ThemeMixin, ActiveMixin, AlarmMixin, BlankWidget):
     """
     A drawing of a rectangle or oval with fill color determined by a process variable and optional label.
     """
@@ -2015,10 +3176,6 @@ class Shape(ActiveMixin, AlarmMixin, BlankWidget):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        style = self.get_style_context()
-        self.theme = {
-            'border': style.get_color(style.get_state())
-        }
         self.value = 0
         self.connect('realize', self.on_realize)
         self.palette = ColorSequence(self.colors)
@@ -2045,7 +3202,7 @@ class Shape(ActiveMixin, AlarmMixin, BlankWidget):
                 color = self.palette(0)
             cr.set_source_rgba(*color)
             cr.fill_preserve()
-        cr.set_source_rgba(*self.theme['border'])
+        cr.set_source_rgba(*self.get_theme()['foreground'])
         cr.stroke()
         if self.labelled:
             xb, yb, w, h = cr.text_extents(self.label)[:4]
@@ -2055,18 +3212,14 @@ class Shape(ActiveMixin, AlarmMixin, BlankWidget):
 
     def on_realize(self, widget):
         self.palette = ColorSequence(self.colors)
-        style = self.get_style_context()
-        self.theme = {
-            'border': style.get_color(style.get_state())
-        }
         if self.channel and not EDITOR:
-            self.pv = gepics.PV(self.channel)
+            self.pv = Channels.open(self, self.channel)
             self.pv.connect('changed', self.on_change)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
 
             if not self.label:
-                self.label_pv = gepics.PV('{}.DESC'.format(self.channel))
+                self.label_pv = Channels.open(self, '{}.DESC'.format(self.channel))
                 self.label_pv.connect('changed', self.on_label_change)
 
     def on_label_change(self, pv, value):
@@ -2078,99 +3231,641 @@ class Shape(ActiveMixin, AlarmMixin, BlankWidget):
         self.queue_draw()
 
 
-class MenuButton(Gtk.Bin):
+class DenseItem(object):
     """
-    A Menu Button for launching DisplayMenu popovers
+    A lightweight monitor drawn by a DenseCanvas in place of its own widget. Items are configured with the
+    properties of the widget class they replace, but have no window, style context or Pango layout of their own.
+
+    :param canvas: DenseCanvas
+    :param order: drawing order of the item
+    :param props: dictionary of widget property values
+    :param rect: (x, y, width, height) of the item within the canvas
     """
-    __gtype_name__ = 'MenuButton'
-    label = GObject.Property(type=str, default='', nick='Label')
-    menu = GObject.Property(type=Gtk.Popover, nick='Display Menu')
+    widget = None
+    size = (20, 20)
+    specs = {}
+
+    __slots__ = (
+        'canvas', 'order', 'props', 'x', 'y', 'width', 'height', 'pv', 'label_pv', 'value', 'alarm_state',
+        'active_state', 'palette'
+    )
+
+    def __init__(self, canvas, order, props, rect):
+        self.canvas = canvas
+        self.order = order
+        self.props = props
+        self.x, self.y, self.width, self.height = rect
+        self.pv = None
+        self.label_pv = None
+        self.value = None
+        self.alarm_state = None
+        self.active_state = None
+        self.palette = ColorSequence(props['colors']) if props.get('colors') else None
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        ctx = self.get_style_context()
-        ctx.add_class('gtkdm')
-        self.btn = Gtk.MenuButton(use_popover=True)
-        self.icon = Gtk.Image.new_from_icon_name('view-paged-symbolic', Gtk.IconSize.MENU)
-        self.text = Gtk.Label(label=self.label)
-        child = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
-        child.pack_start(self.icon, False, False, 0)
-        child.pack_start(self.text, True, True, 0)
-        self.btn.add(child)
-        self.add(self.btn)
-        self.bind_property('label', self.text, 'label', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
-        self.bind_property('menu', self.btn, 'popover', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
+    @classmethod
+    def properties(cls, values):
+        """
+        Convert the text values of widget properties from a display file
+        :param values: dictionary mapping property names to text
+        :return: dictionary of the properties defined by the widget class, with defaults for missing ones
+        """
+        if cls.widget not in cls.specs:
+            cls.specs[cls.widget] = {
+                spec.name.replace('-', '_'): spec
+                for spec in cls.widget.list_properties() if spec.owner_type == cls.widget.__gtype__
+            }
+        props = {}
+        for name, spec in cls.specs[cls.widget].items():
+            text = values.get(name)
+            if text is None:
+                props[name] = getattr(spec, 'default_value', None)
+            elif spec.value_type == GObject.TYPE_BOOLEAN:
+                props[name] = utils.parse_bool(text)
+            elif spec.value_type == GObject.TYPE_INT:
+                props[name] = int(text)
+            elif spec.value_type in (GObject.TYPE_DOUBLE, GObject.TYPE_FLOAT):
+                props[name] = float(text)
+            elif spec.value_type == Gdk.RGBA.__gtype__:
+                props[name] = ColorSequence.parse(text)
+            else:
+                props[name] = text
+        return props
 
+    def open(self):
+        channel = self.props.get('channel')
+        if channel:
+            self.pv = Channels.open(self.canvas, channel)
+            self.pv.connect('changed', self.on_change)
+            self.pv.connect('alarm', self.on_alarm)
+            self.pv.connect('active', self.on_active)
+            if 'label' in self.props and not self.props['label']:
+                self.label_pv = Channels.open(self.canvas, '{}.DESC'.format(channel))
+                self.label_pv.connect('changed', self.on_label_change)
+        else:
+            self.active_state = True
 
-class DisplayMenu(Gtk.Popover):
-    """
-    A Popover menu for DisplayMenuItem entries
-    """
-    __gtype_name__ = 'DisplayMenu'
+    def contains(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.set_border_width(3)
-        self.get_style_context().add_class('gtkdm')
+    def on_change(self, pv, value):
+        self.value = value
+        self.canvas.invalidate(self)
 
+    def on_label_change(self, pv, value):
+        self.props['label'] = value
+        self.canvas.invalidate(self)
 
-class DisplayMenuItem(Gtk.Bin):
-    """
-    A menu item for a display menu linking to a related display.
-    """
-    __gtype_name__ = 'DisplayMenuItem'
-    file = GObject.Property(type=str, default='', nick='Display')
-    label = GObject.Property(type=str, default='', nick='Label')
-    macros = GObject.Property(type=str, default='', nick='Macros')
-    multiple = GObject.Property(type=bool, default=False, nick='Allow Multiple')
+    def on_alarm(self, pv, alarm):
+        if self.props.get('alarm') and alarm != self.alarm_state:
+            self.alarm_state = alarm
+            self.canvas.invalidate(self)
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.entry = Gtk.ModelButton(text=self.label)
-        self.entry.set_size_request(100, -1)
-        self.bind_property('label', self.entry, 'text', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
-        self.add(self.entry)
-        self.entry.connect('clicked', self.on_clicked)
-        self.get_style_context().add_class('gtkdm')
-        self.show_all()
+    def on_active(self, pv, connected):
+        if connected != self.active_state:
+            self.active_state = connected
+            self.canvas.invalidate(self)
+
+    def foreground(self, theme):
+        if self.alarm_state == gepics.Alarm.MAJOR:
+            return theme['critical']
+        elif self.alarm_state == gepics.Alarm.MINOR:
+            return theme['warning']
+        return theme['foreground']
+
+    def render(self, cr, theme):
+        """
+        Draw the item, dimmed while its process variable is disconnected
+        """
+        if self.active_state:
+            self.draw(cr, theme)
+        else:
+            cr.push_group()
+            self.draw(cr, theme)
+            cr.pop_group_to_source()
+            cr.paint_with_alpha(0.5)
 
-    def on_clicked(self, obj):
-        if self.file and not EDITOR:
-            Manager.show_display(self.file, macros_spec=self.macros, multiple=self.multiple)
+    def draw(self, cr, theme):
+        """
+        Draw the item within its rectangle, to be implemented by subclasses. Items draw nothing by default.
+        :param cr: cairo context of the canvas
+        :param theme: theme colors of the canvas
+        """
+        pass
 
 
-class ShellMenuItem(Gtk.Bin):
-    """
-    A menu item for a display menu linking to a shell command.
-    """
-    __gtype_name__ = 'ShellMenuItem'
-    label = GObject.Property(type=str, default='', nick='Label')
-    command = GObject.Property(type=str, default='', nick='Command')
-    multiple = GObject.Property(type=bool, default=False, nick='Allow Multiple')
+class DenseText(DenseItem):
+    widget = TextMonitor
+    size = (80, 20)
+    __slots__ = ('text', 'color')
+    padding = 4
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.entry = Gtk.ModelButton(text=self.label)
-        self.entry.set_size_request(100, -1)
-        self.bind_property('label', self.entry, 'text', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
-        self.add(self.entry)
-        self.proc = None
-        self.entry.connect('clicked', self.on_clicked)
-        self.get_style_context().add_class('gtkdm')
-        self.show_all()
-
-    def on_clicked(self, button):
-        if self.command and not EDITOR:
-            if self.proc:
-                self.proc.poll()
-            if self.multiple or self.proc is None or self.proc.returncode is not None:
-                cmds = self.command.split()
-                self.proc = subprocess.Popen(cmds, shell=True, stdout=subprocess.DEVNULL)
+        self.text = '...'
+        self.color = None
 
+    def on_change(self, pv, value):
+        self.text = format_value(pv, value, prec=self.props['prec'], sci=self.props['sci'], units=self.props['show_units'])
+        if self.palette:
+            self.color = ColorSequence.parse(self.palette[value])
+        super().on_change(pv, value)
 
-class MessageLog(FontMixin, ActiveMixin, Gtk.EventBox):
+    def draw(self, cr, theme):
+        props = self.props
+        layout = self.canvas.get_layout(props['font_size'], props['monospace'], props['bold'])
+        layout.set_text(self.text, -1)
+        ink, logical = layout.get_pixel_extents()
+        space = self.width - 2 * self.padding - logical.width
+        if self.color:
+            color = self.color
+        elif self.alarm_state in (gepics.Alarm.MINOR, gepics.Alarm.MAJOR):
+            color = self.foreground(theme)
+        else:
+            color = props['color'] or theme['foreground']
+        cr.save()
+        cr.rectangle(self.x, self.y, self.width, self.height)
+        cr.clip()
+        cr.set_source_rgba(*color)
+        cr.move_to(self.x + self.padding + space * props['xalign'], self.y + (self.height - logical.height) / 2)
+        PangoCairo.show_layout(cr, layout)
+        cr.restore()
+
+
+class DenseIndicator(DenseItem):
+    widget = Indicator
+    __slots__ = ()
+    margin = 4.5
+
+    def draw(self, cr, theme):
+        size = self.props['size']
+        try:
+            fill = self.palette.spec(int(self.value or 0))
+        except (TypeError, ValueError):
+            fill = self.palette.spec(0)
+        sprite = LEDSprites.get(size, fill, theme['border'].to_string(), self.canvas.get_scale_factor())
+        LEDSprites.blit(cr, sprite, self.x + self.margin, self.y + self.margin, size)
+
+        layout = self.canvas.get_layout()
+        layout.set_text(self.props['label'], -1)
+        ink, logical = layout.get_pixel_extents()
+        cr.set_source_rgba(*theme['foreground'])
+        cr.move_to(self.x + 2 * self.margin + size, self.y + self.margin + size / 2 - logical.height / 2)
+        PangoCairo.show_layout(cr, layout)
+
+
+class DenseByte(DenseItem):
+    widget = Byte
+    size = (80, 100)
+    __slots__ = ('bits', 'labels')
+    margin = 4
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        count = self.props['count']
+        labels = [v.strip() for v in self.props['labels'].split(',')]
+        self.labels = labels + (count - len(labels)) * ['']
+        self.bits = '0' * count
+
+    def on_change(self, pv, value):
+        bits = f'{value:064b}'
+        offset, count = self.props['offset'], self.props['count']
+        if self.props['big_endian']:
+            self.bits = bits[(offset * 8):][:count]
+        else:
+            self.bits = bits[-((offset + 1) * 8):][:count]
+        super().on_change(pv, value)
+
+    def draw(self, cr, theme):
+        props = self.props
+        size, count, columns = props['size'], props['count'], props['columns']
+        stride = ceil(count / columns)
+        col_width = self.width / columns
+        border = theme['border'].to_string()
+        scale = self.canvas.get_scale_factor()
+        layout = self.canvas.get_layout()
+
+        for i, bit in enumerate(self.bits):
+            x = pix(self.x + (i // stride) * col_width + self.margin)
+            y = pix(self.y + self.margin + (i % stride) * (size + 5))
+            LEDSprites.blit(cr, LEDSprites.get(size, self.palette.spec(int(bit)), border, scale), x, y, size)
+            if self.labels[i]:
+                cr.set_source_rgba(*theme['foreground'])
+                layout.set_text(self.labels[i], -1)
+                ink, logical = layout.get_pixel_extents()
+                cr.move_to(2 * self.margin + x + size, y + size / 2 - logical.height / 2)
+                PangoCairo.show_layout(cr, layout)
+
+
+class DenseShape(DenseItem):
+    widget = Shape
+    size = (40, 40)
+    __slots__ = ()
+
+    def draw(self, cr, theme):
+        props = self.props
+        cr.set_line_width(0.75)
+        width = min(self.width - 2, self.height - 2)
+        x = pix(self.x + self.width / 2)
+        y = pix(self.y + self.height / 2)
+
+        if props['oval']:
+            cr.arc(x, y, width / 2, 0, 2 * pi)
+        else:
+            cr.rectangle(x - width // 2, y - width // 2, width, width)
+        if props['filled']:
+            try:
+                color = self.palette(int(self.value or 0))
+            except (TypeError, ValueError):
+                color = self.palette(0)
+            cr.set_source_rgba(*color)
+            cr.fill_preserve()
+        cr.set_source_rgba(*theme['foreground'])
+        cr.stroke()
+        if props['labelled']:
+            cr.set_font_size(min(2 * width // 5, 12))
+            xb, yb, w, h = cr.text_extents(props['label'])[:4]
+            cr.move_to(x - xb - w / 2, y - yb - h / 2)
+            cr.show_text(props['label'])
+            cr.new_path()
+
+
+class DenseCanvas(ThemeMixin, Gtk.DrawingArea):
+    """
+    Flyweight container drawing many simple monitors in a single widget. It is created by the display manager for
+    dense layouts, and replaces each TextMonitor, Indicator, Byte and Shape which has no style classes, signal
+    handlers or children of its own. Updates only invalidate the rectangles of the changed items and only items
+    intersecting the dirty rectangles are redrawn. Items show their process variable name as a tooltip, and it is
+    copied to the clipboard with the middle mouse button, like in the widgets they replace.
+    """
+    __gtype_name__ = 'DenseCanvas'
+    items = GObject.Property(type=str, default='[]', nick='Items')
+
+    KINDS = {
+        'TextMonitor': DenseText,
+        'Indicator': DenseIndicator,
+        'Byte': DenseByte,
+        'Shape': DenseShape,
+    }
+    CELL = 64  # size of the spatial index cells
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.get_style_context().add_class('gtkdm')
+        self.entries = []
+        self.grid = collections.defaultdict(list)
+        self.dirty = set()
+        self.layouts = {}
+        self.set_has_tooltip(True)
+        self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
+        self.connect('realize', self.on_realize)
+        self.connect('query-tooltip', self.on_query_tooltip)
+        self.connect('button-press-event', self.on_mouse_press)
+
+    @classmethod
+    def parse_item(cls, child):
+        """
+        Describe a layout child of a display file as a dense item if it can be drawn by the canvas
+        :param child: xml 'child' element of a layout
+        :return: dictionary or None if the widget can not be replaced
+        """
+        obj = child.find('object')
+        packing = {prop.get('name'): prop.text for prop in child.findall('packing/property')}
+        if obj is None or obj.get('class') not in cls.KINDS or not {'x', 'y'} <= set(packing):
+            return None
+        if any(element.tag != 'property' for element in obj):
+            return None  # style classes, signals, accessibility or children
+        values = {prop.get('name').replace('-', '_'): prop.text or '' for prop in obj.findall('property')}
+        if not utils.parse_bool(values.get('visible', 'True')):
+            return None
+        width, height = cls.KINDS[obj.get('class')].size
+        return {
+            'kind': obj.get('class'),
+            'rect': [
+                int(packing['x']), int(packing['y']),
+                max(int(values.pop('width_request', -1)), 0) or width,
+                max(int(values.pop('height_request', -1)), 0) or height,
+            ],
+            'props': values,
+        }
+
+    def on_realize(self, widget):
+        if self.entries:
+            return
+        width = height = 0
+        for i, spec in enumerate(json.loads(self.items)):
+            kind = self.KINDS[spec['kind']]
+            item = kind(self, i, kind.properties(spec['props']), spec['rect'])
+            self.entries.append(item)
+            for cell in self.cells(item.x, item.y, item.width, item.height):
+                self.grid[cell].append(item)
+            width = max(width, item.x + item.width)
+            height = max(height, item.y + item.height)
+            if not EDITOR:
+                item.open()
+        self.set_size_request(width, height)
+
+    def cells(self, x, y, width, height):
+        """
+        Return the spatial index cells covering a rectangle
+        """
+        return [
+            (i, j)
+            for i in range(int(x // self.CELL), int((x + width) // self.CELL) + 1)
+            for j in range(int(y // self.CELL), int((y + height) // self.CELL) + 1)
+        ]
+
+    def items_in(self, x, y, width, height):
+        """
+        Return the items intersecting a rectangle in drawing order
+        """
+        found = {
+            id(item): item
+            for cell in self.cells(x, y, width, height) for item in self.grid.get(cell, ())
+            if item.x < x + width and x < item.x + item.width and item.y < y + height and y < item.y + item.height
+        }
+        return sorted(found.values(), key=lambda item: item.order)
+
+    def item_at(self, x, y):
+        for item in reversed(self.grid.get((int(x // self.CELL), int(y // self.CELL)), ())):
+            if item.contains(x, y):
+                return item
+
+    def invalidate(self, item):
+        """
+        Mark an item for redrawing
+        """
+        if item not in self.dirty:
+            self.dirty.add(item)
+            self.queue_draw_area(floor(item.x), floor(item.y), ceil(item.width) + 1, ceil(item.height) + 1)
+
+    def get_layout(self, font_size=0, monospace=False, bold=False):
+        """
+        Return the shared Pango layout, configured for the given font options
+        """
+        key = (font_size, monospace, bold)
+        if key not in self.layouts:
+            layout = self.create_pango_layout('')
+            font = layout.get_context().get_font_description().copy()
+            font.set_size(int(font.get_size() * FONT_SCALES.get(font_size, 1.0)))
+            if monospace:
+                font.set_family('Fira Code, monospace')
+            if bold:
+                font.set_weight(Pango.Weight.BOLD)
+            layout.set_font_description(font)
+            self.layouts[key] = layout
+        return self.layouts[key]
+
+    def on_theme_changed(self, *args):
+        super().on_theme_changed(*args)
+        self.layouts = {}
+
+    def do_draw(self, cr):
+        self.dirty.clear()
+        theme = self.get_theme()
+        drawn = set()
+        try:
+            rects = [(rect.x, rect.y, rect.width, rect.height) for rect in cr.copy_clip_rectangle_list()]
+        except cairo.Error:
+            x1, y1, x2, y2 = cr.clip_extents()
+            rects = [(x1, y1, x2 - x1, y2 - y1)]
+        for rect in rects:
+            for item in self.items_in(*rect):
+                if item not in drawn:
+                    drawn.add(item)
+                    item.render(cr, theme)
+
+    def on_query_tooltip(self, widget, x, y, keyboard, tooltip):
+        item = self.item_at(x, y)
+        if item is None or item.pv is None:
+            return False
+        tooltip.set_text(item.pv.name)
+        area = Gdk.Rectangle()
+        area.x, area.y, area.width, area.height = int(item.x), int(item.y), int(item.width), int(item.height)
+        tooltip.set_tip_area(area)
+        return True
+
+    def on_mouse_press(self, widget, event):
+        if event.button == ActiveMixin.PV_COPY_BUTTON:
+            item = self.item_at(event.x, event.y)
+            if item is not None and item.pv is not None:
+                Manager.clipboard.set_text(item.pv.name, -1)
+
+
+class MenuButton(Gtk.Bin):
+    """
+    A Menu Button for launching DisplayMenu popovers
+    """
+    __gtype_name__ = 'MenuButton'
+    label = GObject.Property(type=str, default='', nick='Label')
+    menu = GObject.Property(type=Gtk.Popover, nick='Display Menu')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        ctx = self.get_style_context()
+        ctx.add_class('gtkdm')
+        self.btn = Gtk.MenuButton(use_popover=True)
+        self.icon = Gtk.Image.new_from_icon_name('view-paged-symbolic', Gtk.IconSize.MENU)
+        self.text = Gtk.Label(label=self.label)
+        child = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        child.pack_start(self.icon, False, False, 0)
+        child.pack_start(self.text, True, True, 0)
+        self.btn.add(child)
+        self.add(self.btn)
+        self.bind_property('label', self.text, 'label', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
+        self.bind_property('menu', self.btn, 'popover', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
+
+
+class DisplayMenu(Gtk.Popover):
+    """
+    A Popover menu for DisplayMenuItem entries
+    """
+    __gtype_name__ = 'DisplayMenu'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_border_width(3)
+        self.get_style_context().add_class('gtkdm')
+
+
+class DisplayMenuItem(Gtk.Bin):
+    """
+    A menu item for a display menu linking to a related display.
+    """
+    __gtype_name__ = 'DisplayMenuItem'
+    file = GObject.Property(type=str, default='', nick='Display')
+    label = GObject.Property(type=str, default='', nick='Label')
+    macros = GObject.Property(type=str, default='', nick='Macros')
+    multiple = GObject.Property(type=bool, default=False, nick='Allow Multiple')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entry = Gtk.ModelButton(text=self.label)
+        self.entry.set_size_request(100, -1)
+        self.bind_property('label', self.entry, 'text', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
+        self.add(self.entry)
+        self.entry.connect('clicked', self.on_clicked)
+        self.get_style_context().add_class('gtkdm')
+        self.show_all()
+
+    def on_clicked(self, obj):
+        if self.file and not EDITOR:
+            Manager.show_display(self.file, macros_spec=self.macros, multiple=self.multiple)
+
+
+class ShellMenuItem(Gtk.Bin):
+    """
+    A menu item for a display menu linking to a shell command.
+    """
+    __gtype_name__ = 'ShellMenuItem'
+    label = GObject.Property(type=str, default='', nick='Label')
+    command = GObject.Property(type=str, default='', nick='Command')
+    multiple = GObject.Property(type=bool, default=False, nick='Allow Multiple')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entry = Gtk.ModelButton(text=self.label)
+        self.entry.set_size_request(100, -1)
+        self.bind_property('label', self.entry, 'text', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
+        self.add(self.entry)
+        self.proc = None
+        self.entry.connect('clicked', self.on_clicked)
+        self.get_style_context().add_class('gtkdm')
+        self.show_all()
+
+    def on_clicked(self, button):
+        if self.command and not EDITOR:
+            if self.proc:
+                self.proc.poll()
+            if self.multiple or self.proc is None or self.proc.returncode is not None:
+                cmds = self.command.split()
+                self.proc = subprocess.Popen(cmds, shell=True, stdout=subprocess.DEVNULL)
+
+
+class MessageList(ThemeMixin, Gtk.Box):
+    """
+    Virtualized view of a utils.MessageBuffer which only lays out the visible rows, with a text filter.
+    :param model: utils.MessageBuffer
+    :param show_time: whether to prefix messages with their time
+    """
+    COLORS = {
+        gepics.Alarm.MAJOR.value: 'Red',
+        gepics.Alarm.MINOR.value: 'Orange',
+        gepics.Alarm.INVALID.value: 'Gray',
+    }
+
+    def __init__(self, model, show_time=True):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=3)
+        self.model = model
+        self.show_time = show_time
+        self.matches = None     # sequence numbers of messages matching the filter, None when not filtering
+        self.needle = ''
+        self.row_height = 0
+        self.colors = {}
+        for severity, name in self.COLORS.items():
+            self.colors[severity] = Gdk.RGBA()
+            self.colors[severity].parse(name)
+
+        self.entry = Gtk.SearchEntry()
+        self.entry.connect('search-changed', self.on_search)
+        self.canvas = Gtk.DrawingArea()
+        self.canvas.add_events(Gdk.EventMask.SCROLL_MASK | Gdk.EventMask.SMOOTH_SCROLL_MASK)
+        self.canvas.connect('draw', self.on_draw)
+        self.canvas.connect('scroll-event', self.on_scroll)
+        self.canvas.connect('size-allocate', lambda *args: self.update_adjustment())
+        self.adj = Gtk.Adjustment(value=0, lower=0, upper=0, step_increment=1, page_increment=1, page_size=0)
+        self.adj.connect('value-changed', lambda adj: self.canvas.queue_draw())
+        scrollbar = Gtk.Scrollbar(orientation=Gtk.Orientation.VERTICAL, adjustment=self.adj)
+
+        frame = Gtk.Frame()
+        box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        box.pack_start(self.canvas, True, True, 0)
+        box.pack_start(scrollbar, False, False, 0)
+        frame.add(box)
+        self.pack_start(self.entry, False, False, 0)
+        self.pack_start(frame, True, True, 0)
+
+    def row_count(self):
+        if self.matches is None:
+            return len(self.model)
+        return len(self.matches)
+
+    def row_seq(self, row):
+        if self.matches is None:
+            return self.model.first + row
+        return self.matches[row]
+
+    def at_end(self):
+        return self.adj.get_value() >= self.adj.get_upper() - self.adj.get_page_size() - self.row_height
+
+    def refresh(self, start):
+        """
+        Update the view after messages have been appended
+        :param start: sequence number of the first new message
+        """
+        follow = self.at_end()
+        if self.matches is not None:
+            matches = self.matches[self.matches >= self.model.first]
+            self.matches = numpy.concatenate([matches, self.model.search(self.needle, start)])
+        self.update_adjustment(follow)
+        self.canvas.queue_draw()
+
+    def update_adjustment(self, follow=False):
+        if not self.row_height:
+            layout = self.canvas.create_pango_layout('Xg')
+            self.row_height = layout.get_pixel_size()[1] + 1
+        page = self.canvas.get_allocated_height()
+        upper = self.row_count() * self.row_height
+        self.adj.configure(
+            upper - page if follow else min(self.adj.get_value(), max(0, upper - page)), 0, upper,
+            self.row_height, page * 0.9, page
+        )
+
+    def on_search(self, entry):
+        self.needle = entry.get_text()
+        self.matches = self.model.search(self.needle) if self.needle else None
+        self.update_adjustment(follow=True)
+        self.canvas.queue_draw()
+
+    def on_scroll(self, widget, event):
+        if event.direction == Gdk.ScrollDirection.SMOOTH:
+            delta = event.delta_y * self.row_height * 3
+        elif event.direction in (Gdk.ScrollDirection.UP, Gdk.ScrollDirection.DOWN):
+            delta = (-1 if event.direction == Gdk.ScrollDirection.UP else 1) * self.row_height * 3
+        else:
+            return False
+        value = self.adj.get_value() + delta
+        self.adj.set_value(min(max(value, 0), self.adj.get_upper() - self.adj.get_page_size()))
+        return True
+
+    def on_draw(self, widget, cr):
+        if not self.row_height:
+            self.update_adjustment()
+        color = self.get_theme()['foreground']
+        width = widget.get_allocated_width()
+        height = widget.get_allocated_height()
+        layout = widget.create_pango_layout('')
+        layout.set_width((width - 6) * Pango.SCALE)
+        layout.set_ellipsize(Pango.EllipsizeMode.END)
+
+        value = self.adj.get_value()
+        first = int(value // self.row_height)
+        last = min(self.row_count(), first + int(height // self.row_height) + 2)
+        for row in range(first, last):
+            stamp, severity, text = self.model.row(self.row_seq(row))
+            if self.show_time:
+                text = "{} - {}".format(datetime.fromtimestamp(stamp).strftime("%m/%d %H:%M:%S"), text)
+            layout.set_text(text.replace('\n', ' '), -1)
+            cr.set_source_rgba(*self.colors.get(severity, color))
+            cr.move_to(3, row * self.row_height - value)
+            PangoCairo.show_layout(cr, layout)
+        return False
+
+
+class MessageLog(FontMixin, ActiveMixin, Gtk.EventBox):
     """
     A rolling log viewer displaying values from the process variable with optional time prefix and alarm colors.
+    In virtual mode, messages are kept in a compact ring buffer and only the visible rows are laid out, which
+    suits very large buffer sizes.
     """
     __gtype_name__ = 'MessageLog'
 
@@ -2178,6 +3873,7 @@ class MessageLog(FontMixin, ActiveMixin, Gtk.EventBox):
     alarm = GObject.Property(type=bool, default=False, nick='Alarm Sensitive')
     buffer_size = GObject.Property(type=int, default=5000, nick='Buffer Size')
     show_time = GObject.Property(type=bool, default=True, nick='Show Time')
+    virtual = GObject.Property(type=bool, default=False, nick='Virtual List')
 
     font_size = GObject.Property(type=int, minimum=-3, maximum=3, default=0, nick='Font Size')
     monospace = GObject.Property(type=bool, default=False, nick='Monospace Font')
@@ -2203,38 +3899,244 @@ class MessageLog(FontMixin, ActiveMixin, Gtk.EventBox):
             gepics.Alarm.NORMAL: self.buffer.create_tag(wrap_mode=Gtk.WrapMode.WORD),
             gepics.Alarm.INVALID: self.buffer.create_tag(foreground='Gray', wrap_mode=Gtk.WrapMode.WORD),
         }
-        self.active_tag = self.tags[gepics.Alarm.NORMAL]
+        self.active_alarm = gepics.Alarm.NORMAL
+        self.list = None
+        self.end_mark = self.buffer.create_mark('end', self.buffer.get_end_iter(), False)
+        self.value = None
+        self.pending = collections.deque(maxlen=self.buffer_size)
+        self.flush_id = 0
+        self.last_second = None
+        self.last_time = ''
         self.connect('realize', self.on_realize)
         self.get_style_context().add_class('gtkdm')
 
     def on_realize(self, obj):
         pv_name = self.channel
+        self.pending = collections.deque(maxlen=self.buffer_size)
+        if self.virtual and not self.list:
+            self.list = MessageList(utils.MessageBuffer(self.buffer_size), show_time=self.show_time)
+            self.remove(self.sw)
+            self.add(self.list)
+            self.list.show_all()
         if pv_name:
-            self.pv = gepics.PV(pv_name)
+            self.pv = Channels.open(self, pv_name)
             self.pv.connect('changed', self.on_change)
+            self.pv.connect('time', self.on_time)
             self.pv.connect('alarm', self.on_alarm)
             self.pv.connect('active', self.on_active)
         super().on_realize(obj)
 
     def on_change(self, pv, value):
-        lines = self.buffer.get_line_count()
-        if lines > self.buffer_size:
-            start_iter = self.buffer.get_start_iter()
-            end_iter = self.buffer.get_start_iter()
-            end_iter.forward_lines(10)
-            self.buffer.delete(start_iter, end_iter)
-
-        _iter = self.buffer.get_end_iter()
-        if self.show_time:
-            text = "{} - {}\n".format(datetime.now().strftime("%m/%d %H:%M:%S"), value)
-        else:
-            text = "{}\n".format(value)
-        self.buffer.insert_with_tags(_iter, text, self.active_tag)
-        self.adj.set_value(self.adj.get_upper() - self.adj.get_page_size())
+        # queued once its timestamp arrives, which is always emitted right after it
+        self.value = value
+
+    def on_time(self, pv, stamp):
+        self.pending.append((stamp, self.value, self.active_alarm))
+        if not self.flush_id:
+            self.flush_id = self.add_tick_callback(self.flush)
+
+    def format_time(self, stamp):
+        # messages often arrive many per second, so the formatted time is reused within the same second
+        second = int(stamp.timestamp())
+        if second != self.last_second:
+            self.last_second = second
+            self.last_time = stamp.strftime("%m/%d %H:%M:%S")
+        return self.last_time
+
+    def flush(self, widget, clock):
+        """
+        Append all queued messages with one insert per run of messages with the same tag, trim the buffer with a
+        single delete, and scroll to the end unless the user has scrolled up
+        """
+        self.flush_id = 0
+        entries = list(self.pending)
+        self.pending.clear()
+        if self.list:
+            start = self.list.model.total
+            self.list.model.extend(
+                [stamp.timestamp() for stamp, value, alarm in entries],
+                [alarm.value for stamp, value, alarm in entries],
+                ['{}'.format(value) for stamp, value, alarm in entries],
+            )
+            self.list.refresh(start)
+            return GLib.SOURCE_REMOVE
+
+        at_end = self.adj.get_value() >= self.adj.get_upper() - self.adj.get_page_size() - 1
+        runs = []
+        for stamp, value, alarm in entries:
+            tag = self.tags[alarm]
+            text = "{} - {}\n".format(self.format_time(stamp), value) if self.show_time else "{}\n".format(value)
+            if runs and runs[-1][1] is tag:
+                runs[-1][0].append(text)
+            else:
+                runs.append(([text], tag))
+        for texts, tag in runs:
+            self.buffer.insert_with_tags(self.buffer.get_end_iter(), ''.join(texts), tag)
+
+        excess = self.buffer.get_line_count() - self.buffer_size - 1
+        if excess > 0:
+            self.buffer.delete(self.buffer.get_start_iter(), self.buffer.get_iter_at_line(excess))
+
+        if at_end:
+            self.view.scroll_to_mark(self.end_mark, 0.0, False, 0.0, 1.0)
+        return GLib.SOURCE_REMOVE
 
     def on_alarm(self, pv, alarm):
         if self.alarm:
-            self.active_tag = self.tags[alarm]
+            self.active_alarm = alarm
+
+
+class ChannelTable(ThemeMixin, FontMixin, Gtk.Bin):
+    """
+    A table of readbacks of many process variables. Rows come from a channel pattern with row variables of the form
+    $(N), expanded over the row ranges (for example "N=1..300"), or from a channel list file. The rows are kept in
+    a list store shown by a tree view, which only renders the visible rows, and value changes are applied to the
+    store once per frame.
+    """
+    __gtype_name__ = 'ChannelTable'
+
+    channel = GObject.Property(type=str, default='', nick='Channel Pattern')
+    ranges = GObject.Property(type=str, default='', nick='Row Ranges')
+    labels = GObject.Property(type=str, default='', nick='Label Pattern')
+    file = GObject.Property(type=str, default='', nick='Channel File')
+    alarm = GObject.Property(type=bool, default=False, nick='Alarm Sensitive')
+    prec = GObject.Property(type=int, default=-1, minimum=-1, maximum=10, nick='Precision')
+    sci = GObject.Property(type=bool, default=False, nick='Sci. Format')
+    show_units = GObject.Property(type=bool, default=True, nick='Show Units')
+    show_headers = GObject.Property(type=bool, default=True, nick='Show Headers')
+
+    font_size = GObject.Property(type=int, minimum=-3, maximum=3, default=0, nick='Font Size')
+    monospace = GObject.Property(type=bool, default=False, nick='Monospace Font')
+    bold = GObject.Property(type=bool, default=False, nick='Bold Font')
+
+    NAME, VALUE, CHANNEL, COLOR, ACTIVE = range(5)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store = Gtk.ListStore(str, str, str, Gdk.RGBA, bool)
+        self.view = Gtk.TreeView()
+        renderer = Gtk.CellRendererText()
+        column = Gtk.TreeViewColumn('Name', renderer, text=self.NAME, sensitive=self.ACTIVE)
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        column.set_expand(True)
+        column.set_resizable(True)
+        self.view.append_column(column)
+
+        renderer = Gtk.CellRendererText(xalign=1.0)
+        column = Gtk.TreeViewColumn(
+            'Value', renderer, text=self.VALUE, foreground_rgba=self.COLOR, sensitive=self.ACTIVE
+        )
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        column.set_expand(True)
+        column.set_alignment(1.0)
+        self.view.append_column(column)
+
+        # all rows have the same height, so that only the visible rows are measured
+        self.view.set_fixed_height_mode(True)
+        self.view.set_tooltip_column(self.CHANNEL)
+        self.view.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
+        self.view.connect('button-press-event', self.on_mouse_press)
+        self.bind_property(
+            'show-headers', self.view, 'headers-visible', GObject.BindingFlags.DEFAULT | GObject.BindingFlags.SYNC_CREATE
+        )
+
+        self.sw = Gtk.ScrolledWindow()
+        self.sw.set_shadow_type(Gtk.ShadowType.IN)
+        self.sw.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        self.sw.add(self.view)
+        self.add(self.sw)
+
+        self.iters = []
+        self.texts = []
+        self.pvs = []
+        self.alarms = {}
+        self.pending = {}
+        self.flush_id = 0
+        self.get_style_context().add_class('gtkdm')
+        self.connect('realize', self.on_realize)
+
+    def get_rows(self):
+        """
+        Return the list of (channel, label) tuples of the table rows
+        """
+        if self.file:
+            path = Manager.find_display(self.file)
+            if not path:
+                logger.error('Channel List {} not found'.format(self.file))
+                return []
+            return utils.read_channel_list(path)
+        elif self.channel:
+            return [
+                (utils.expand_pattern(self.channel, variables), utils.expand_pattern(self.labels, variables))
+                for variables in utils.expand_ranges(self.ranges)
+            ]
+        return []
+
+    def on_realize(self, obj):
+        if not self.iters:
+            rows = self.get_rows()
+            self.view.set_model(None)  # fill the store without updating the view for each row
+            self.iters = [self.store.append([label or channel, '...', channel, None, EDITOR]) for channel, label in rows]
+            self.texts = ['...'] * len(rows)
+            self.view.set_model(self.store)
+            if not EDITOR:
+                for i, (channel, label) in enumerate(rows):
+                    pv = Channels.open(self, channel)
+                    pv.connect('changed', self.on_change, i)
+                    pv.connect('alarm', self.on_alarm, i)
+                    pv.connect('active', self.on_active, i)
+                    self.pvs.append(pv)
+        super().on_realize(obj)
+
+    def on_change(self, pv, value, row):
+        text = format_value(pv, value, prec=self.prec, sci=self.sci, units=self.show_units)
+        if text != self.texts[row]:
+            self.texts[row] = text
+            self.queue(row, self.VALUE, text)
+
+    def on_alarm(self, pv, alarm, row):
+        if self.alarm:
+            if alarm in (gepics.Alarm.MINOR, gepics.Alarm.MAJOR):
+                self.alarms[row] = alarm
+            else:
+                self.alarms.pop(row, None)
+            self.queue(row, self.COLOR, self.alarm_color(alarm))
+
+    def alarm_color(self, alarm):
+        theme = self.get_theme()
+        return {gepics.Alarm.MINOR: theme['warning'], gepics.Alarm.MAJOR: theme['critical']}.get(alarm)
+
+    def on_theme_changed(self, *args):
+        super().on_theme_changed(*args)
+        for row, alarm in self.alarms.items():
+            self.queue(row, self.COLOR, self.alarm_color(alarm))
+
+    def on_active(self, pv, connected, row):
+        self.queue(row, self.ACTIVE, connected)
+
+    def queue(self, row, column, value):
+        """
+        Queue a cell change, changes are applied to the store once per frame
+        """
+        self.pending.setdefault(row, {})[column] = value
+        if not self.flush_id:
+            self.flush_id = self.add_tick_callback(self.flush)
+
+    def flush(self, widget, clock):
+        """
+        Apply all queued cell changes with one store update per changed row
+        """
+        self.flush_id = 0
+        pending, self.pending = self.pending, {}
+        for row, cells in pending.items():
+            self.store.set(self.iters[row], list(cells.keys()), list(cells.values()))
+        return GLib.SOURCE_REMOVE
+
+    def on_mouse_press(self, view, event):
+        if event.button == ActiveMixin.PV_COPY_BUTTON:
+            found = view.get_path_at_pos(int(event.x), int(event.y))
+            if found:
+                Manager.clipboard.set_text(self.store[found[0]][self.CHANNEL], -1)
 
 
 class HideSwitch(Gtk.Bin):
@@ -2259,8 +4161,7 @@ class HideSwitch(Gtk.Bin):
                 w = top_level.builder.get_object(name.strip())
                 if w:
                     self.btn.bind_property('active', w, 'visible', GObject.BindingFlags.DEFAULT|GObject.BindingFlags.SYNC_CREATE)
-        GLib.timeout_add(2000, self.btn.set_active, self.default)
-        # self.btn.set_active(self.default)
+        Clock.subscribe(2.0, self.btn.set_active, self.default, owner=self, once=True)
 
 
 class ChartCoord(object):
@@ -2281,66 +4182,207 @@ class ChartCoord(object):
         self.xscale = self.width / (self.xmax - self.xmin)
         self.yscale = self.height / (self.ymax - self.ymin)
 
-    def xy(self, points, xoff=0.0, yoff=0.0):
-        points = numpy.asarray(points)
-        out = numpy.zeros_like(points)
-        out[:, 0] = (points[:, 0] - self.xmin) * self.xscale + self.orgx + xoff
-        out[:, 1] = self.orgy - (points[:, 1] - self.ymin) * self.yscale + yoff
+    def xy(self, points, xoff=0.0, yoff=0.0, out=None):
+        """
+        Transform (x, y) data points to pixel coordinates
+        :param points: (count, 2) array of data points
+        :param xoff: x offset in pixels
+        :param yoff: y offset in pixels
+        :param out: optional (count, 2) output array, may be points itself for an in-place transform
+        """
+        points = numpy.asarray(points, dtype=float)
+        if out is None:
+            out = numpy.empty(points.shape)
+        self.x(points[:, 0], xoff, out=out[:, 0])
+        self.y(points[:, 1], yoff, out=out[:, 1])
         return out
 
-    def x(self, points, offset=0.0):
-        points = numpy.asarray(points)
-        return (points - self.xmin) * self.xscale + self.orgx + offset
+    def x(self, points, offset=0.0, out=None):
+        out = numpy.subtract(points, self.xmin, out=out)
+        out *= self.xscale
+        out += self.orgx + offset
+        return out
 
-    def y(self, points, offset=0.0):
-        points = numpy.asarray(points)
-        return self.orgy - (points - self.ymin) * self.yscale + offset
+    def y(self, points, offset=0.0, out=None):
+        out = numpy.subtract(points, self.ymin, out=out)
+        out *= -self.yscale
+        out += self.orgy + offset
+        return out
+
+    def trace(self, x, y, buffer, resolution=1.0, upper=None):
+        """
+        Mask out missing values, transform and decimate a trace in one pass over preallocated buffers
+        :param x: non-decreasing data x values
+        :param y: data y values, NaN for missing values
+        :param buffer: utils.TraceBuffer
+        :param resolution: pixel column width in pixel coordinates
+        :param upper: optional upper y values, to draw the envelope between y and upper
+        :return: (count, 2) view of the buffer holding the pixel coordinates, valid until the buffer is reused
+        """
+        count = len(x) if upper is None else 2 * len(x)
+        buffer.reserve(count)
+        points = buffer.points[:count]
+        if upper is None:
+            points[:, 0] = x
+            points[:, 1] = y
+        else:
+            points[0::2, 0] = x
+            points[1::2, 0] = x
+            points[0::2, 1] = y
+            points[1::2, 1] = upper
+
+        missing = buffer.mask[:count]
+        numpy.isnan(points[:, 1], out=missing)
+        if missing.any():
+            valid = numpy.logical_not(missing, out=missing)
+            if not valid.any():
+                return points[:0]
+            # trim leading and trailing gaps without copying, only compact gaps within the trace
+            first, last = valid.argmax(), count - valid[::-1].argmax()
+            points, valid = points[first:last], valid[first:last]
+            if not valid.all():
+                points = numpy.compress(valid, points, axis=0, out=buffer.work[:numpy.count_nonzero(valid)])
+        self.xy(points, out=points)
+        return utils.decimate_points(points, resolution, buffer)
 
 
 class ChartPair(GObject.GObject):
+    """
+    Paired x and y values of two process variables, kept from their monitor updates. In scalar mode, the pairs
+    are buffered in a ring buffer and each combination of updates is recorded once. When a tolerance is given and
+    the timestamps of both values differ by more than the tolerance, the pair waits up to the tolerance for an
+    update of the lagging value before it is recorded with the held value. Changes are coalesced on the Clock into
+    at most one 'changed' signal per update period, always including the most recent update.
+    """
     __gsignals__ = {
         'changed': (GObject.SIGNAL_RUN_FIRST, None, [])
     }
 
-    def __init__(self, xname, yname, size=1, update=0.01):
+    def __init__(self, xname, yname, size=1, update=0.01, tolerance=0.0, owner=None):
         super().__init__()
         self.size = size
         self.array_mode = False
-        self.data = numpy.empty((self.size, 2))
-
-        self.ypv = gepics.PV(yname)
-        self.ypv.connect('changed', self.on_change)
+        self.history = utils.RingBuffer(self.size, 2)
+        self.data = self.history.data
+        self.tolerance = tolerance
+        self.values = [None, None]
+        self.times = [None, None]
+        self.paired = None
+        self.waiting = None
+        self.index = 0
+
+        self.ypv = Channels.open(owner, yname)
+        self.ypv.connect('changed', self.on_change, 1)
+        self.ypv.connect('time', self.on_time, 1)
         self.ypv.connect('active', self.on_active)
 
         if xname.strip() == '#':
             self.xpv = None
         else:
-            self.xpv = gepics.PV(xname)
-            self.xpv.connect('changed', self.on_change)
+            self.xpv = Channels.open(owner, xname)
+            self.xpv.connect('changed', self.on_change, 0)
+            self.xpv.connect('time', self.on_time, 0)
             self.xpv.connect('active', self.on_active)
 
         self.min_update = update
-        self.last_change = time.time()
+        self.last_emit = 0.0
+        self.dirty = False
+        self.tick = None
+        if owner is not None:
+            owner.connect('destroy', self.close)
+
+    def on_change(self, pv, value, axis):
+        self.values[axis] = value
+        if self.array_mode:
+            self.update_column(axis, value)
+            self.dirty = True
+            self.schedule()
+
+    def on_time(self, pv, stamp, axis):
+        # time is always emitted right after the value it belongs to
+        self.times[axis] = stamp.timestamp()
+        if not self.array_mode:
+            self.pair()
+            self.schedule()
+
+    def pair(self):
+        """
+        Record the latest x and y values as a pair, keyed on the newer of their timestamps. An update carrying the
+        same timestamp as the last recorded pair completes that pair in place instead of adding another one.
+        :return: True if the pair is waiting for an update of the lagging value
+        """
+        x, y = self.values
+        if self.xpv is None:
+            if self.times[1] in (None, self.paired):
+                return False
+            x, key = self.index, self.times[1]
+        elif None in self.times:
+            return False
+        else:
+            key = max(self.times)
+            if 0 < self.tolerance < abs(self.times[0] - self.times[1]) and key != self.paired:
+                now = time.monotonic()
+                if self.waiting is None:
+                    self.waiting = now
+                if now - self.waiting < self.tolerance:
+                    return True
+        self.waiting = None
 
-    def on_change(self, pv, value):
-        if time.time() - self.last_change >= self.min_update:
-            y = self.ypv.get()
-            if self.xpv:
-                x = self.xpv.get()
-            else:
-                x = numpy.arange(0, len(y))
+        try:
+            point = (float(x), float(y))
+        except (TypeError, ValueError):
+            return False
+        if key == self.paired:
+            self.history.latest()[:] = point
+        else:
+            self.history.append(point)
+            self.paired = key
+            if self.xpv is None:
+                self.index += 1
+        self.dirty = True
+        return False
 
-            if self.array_mode:
-                cx = self.data.shape[0] if len(x) == 1 else x.shape[0]
-                cy = self.data.shape[0] if len(y) == 1 else y.shape[0]
-                self.data[:cx, 0] = x
-                self.data[:cy, 1] = y
-            else:
-                self.data[:-1] = self.data[1:]
-                self.data[-1] = (x, y)
+    def update_column(self, axis, value):
+        """
+        Copy a monitored array into its column of the data buffer in place
+        :param axis: column index, 0 for x and 1 for y
+        :param value: array or scalar value, a scalar fills the whole column
+        """
+        value = numpy.atleast_1d(value)
+        if len(value) == 1:
+            self.data[:, axis] = value[0]
+        else:
+            count = min(len(value), self.data.shape[0])
+            self.data[:count, axis] = value[:count]
 
+    def schedule(self, delay=0.0):
+        """
+        Emit a 'changed' signal on the first clock tick after the minimum update period has elapsed since the
+        previous one
+        :param delay: minimum delay in seconds
+        """
+        if self.tick is None:
+            delay = max(delay, self.min_update - (time.monotonic() - self.last_emit))
+            self.tick = Clock.subscribe(delay, self.flush, once=True)
+
+    def flush(self):
+        self.tick = None
+        if not self.array_mode and self.pair():
+            # check again once the lagging value is overdue
+            self.schedule(self.tolerance - (time.monotonic() - self.waiting))
+        if self.dirty:
+            self.dirty = False
+            self.last_emit = time.monotonic()
             self.emit('changed')
-            self.last_change = time.time()
+        return False
+
+    def close(self, *args):
+        """
+        Cancel any pending update
+        """
+        if self.tick is not None:
+            Clock.unsubscribe(self.tick)
+        self.tick = None
 
     def on_active(self, pv, active):
         # prepare data array according to pv sizes
@@ -2348,25 +4390,124 @@ class ChartPair(GObject.GObject):
             if self.xpv is None:
                 sizes = (self.ypv.count, self.ypv.count)
             elif self.xpv.is_active():
-                sizes = (self.ypv.count, self.ypv.count)
+                sizes = (self.xpv.count, self.ypv.count)
             else:
                 return
             if sizes == (1, 1):
-                self.data = numpy.empty((self.size, 2))
+                self.history = utils.RingBuffer(self.size, 2)
+                self.data = self.history.data
                 self.array_mode = False
+                self.paired = None
             else:
-                self.data = numpy.empty((max(sizes), 2))
+                self.data = numpy.full((max(sizes), 2), numpy.nan)
                 self.array_mode = True
+                if self.xpv is None:
+                    self.data[:, 0] = numpy.arange(self.data.shape[0])
+                for axis, value in enumerate(self.values):
+                    if value is not None and not (axis == 0 and self.xpv is None):
+                        self.update_column(axis, value)
 
+    def segments(self):
+        """
+        Return the data points in chronological order as a list of (offset, view) pairs without copying
+        """
+        if self.array_mode:
+            return [(0, self.data)]
+        return self.history.segments()
 
-class XYScatter(Gtk.DrawingArea):
+
+class OffscreenMixin(object):
+    """
+    Optional rendering of a chart on a worker thread. The widget implements calculate_parameters(),
+    snapshot(copy), returning a consistent copy of everything needed to render a frame, and render(cr, frame),
+    which must not touch the widget itself. Frames are rendered into a
+    cairo.ImageSurface by a worker, at most one pending frame per widget, and the main thread only paints the
+    latest finished frame. The smoothed latency from snapshot to finished frame is kept in `latency`, in seconds.
+    """
+    frame_traces = None
+    frame_surface = None
+    frame_key = None
+    frame_pending = False
+    frame_dirty = False
+    latency = 0.0
+
+    def redraw(self):
+        """
+        Queue a redraw with fresh data, rendering a new frame first if threaded rendering is enabled
+        """
+        if self.threaded and not EDITOR:
+            self.request_frame()
+        else:
+            self.queue_draw()
+
+    def request_frame(self):
+        if self.frame_pending:
+            self.frame_dirty = True
+            return
+        self.calculate_parameters()
+        frame = self.snapshot(copy=True)
+        self.frame_key = (frame['params'].get('key'), frame['scale'])
+        self.frame_pending = True
+        future = WORKERS.submit(self.render_frame, frame)
+        future.add_done_callback(lambda f: GLib.idle_add(self.on_frame_rendered, frame, f))
+
+    def frame_buffer(self):
+        """
+        Return the trace buffer reserved for frames rendered by the worker. It is never used by the main thread,
+        and at most one frame per widget is rendered at a time.
+        """
+        if self.frame_traces is None:
+            self.frame_traces = utils.TraceBuffer()
+        return self.frame_traces
+
+    def render_frame(self, frame):
+        width, height = frame['size']
+        scale = frame['scale']
+        surface = cairo.ImageSurface(
+            cairo.FORMAT_ARGB32, max(1, int(ceil(width * scale))), max(1, int(ceil(height * scale)))
+        )
+        surface.set_device_scale(scale, scale)
+        self.render(cairo.Context(surface), frame)
+        surface.flush()
+        return surface
+
+    def on_frame_rendered(self, frame, future):
+        self.frame_pending = False
+        try:
+            self.frame_surface = future.result()
+        except Exception as e:
+            logger.error('Unable to render {}: {}'.format(self.get_name(), e))
+        else:
+            latency = time.monotonic() - frame['time']
+            self.latency = latency if not self.latency else 0.8 * self.latency + 0.2 * latency
+            logger.debug('{} frame latency: {:0.1f} ms'.format(self.get_name(), latency * 1000))
+        if self.frame_dirty:
+            self.frame_dirty = False
+            self.request_frame()
+        self.queue_draw()
+        return False
+
+    def draw_offscreen(self, cr):
+        """
+        Paint the latest finished frame, requesting a new one if the layout or scale has changed since
+        """
+        if self.frame_key != (self.params.get('key'), self.get_scale_factor()):
+            self.request_frame()
+        if self.frame_surface is not None:
+            cr.set_source_surface(self.frame_surface, 0, 0)
+            cr.paint()
+
+
+class XYScatter(ThemeMixin, OffscreenMixin, Gtk.DrawingArea):
     __gtype_name__ = 'XYScatter'
     buffer = GObject.Property(type=int, default=1, minimum=1, maximum=100, nick='Buffer Size')
     sample = GObject.Property(type=float, default=10, minimum=.1, maximum=50, nick='Update Freq (hz)')
+    tolerance = GObject.Property(type=float, default=0.0, minimum=0.0, maximum=10.0, nick='Pair Tolerance (s)')
     color_bg = GObject.Property(type=Gdk.RGBA, nick='Background Color')
     color_fg = GObject.Property(type=Gdk.RGBA, nick='Foreground Color')
     colors = GObject.Property(type=str, default='RGYOPB', nick='Plot Colors')
     fade = GObject.Property(type=bool, default=True, nick='Fade Old Values')
+    threaded = GObject.Property(type=bool, default=False, nick='Threaded Rendering')
     fontsize = GObject.Property(type=int, minimum=5, default=9, maximum=30, nick='Font Size')
     digits = GObject.Property(type=int, minimum=0, default=3, maximum=8, nick='Significant Digits')
 
@@ -2398,42 +4539,17 @@ class XYScatter(Gtk.DrawingArea):
         self.params = {}
         self.plots = []
         self.palette = None
+        self.traces = utils.TraceBuffer()
 
         self.connect('realize', self.on_realize)
 
     def calculate_parameters(self):
-        xminimum, xmaximum, xmajor, xminor = tick_points(self.xmin, self.xmax, self.xstep, self.xticks)
-        yminimum, ymaximum, ymajor, yminor = tick_points(self.ymin, self.ymax, self.ystep, self.yticks)
-
-        xmajor_points = list(zip(xmajor, (yminimum,) * len(xmajor)))
-        xminor_points = list(zip(xminor, (yminimum,) * len(xminor)))
-
-        ymajor_points = list(zip((xminimum,) * len(ymajor), ymajor))
-        yminor_points = list(zip((xminimum,) * len(yminor), yminor))
-
         alloc = self.get_allocation()
-
-        yoffset = 0.0 if not self.show_xaxis else self.fontsize * 2
-        xoffset = 0.0 if not self.show_yaxis else self.fontsize * 3
-
-        self.params = {
-            'alloc': alloc,
-            'xmin': xminimum,
-            'xmax': xmaximum,
-            'xmajor': xmajor_points,
-            'xminor': xminor_points,
-            'ymin': yminimum,
-            'ymax': ymaximum,
-            'ymajor': ymajor_points,
-            'yminor': yminor_points,
-            'converter': ChartCoord(
-                xlimits=(xminimum, xmaximum),
-                ylimits=(yminimum, ymaximum),
-                size=(alloc.width, alloc.height),
-                margins=(self.marginx, self.marginy),
-                xoffset=xoffset, yoffset=yoffset
-            )
-        }
+        self.params = AxisEngine.layout(
+            (self.xmin, self.xmax), self.xstep, self.xticks, (self.ymin, self.ymax), self.ystep, self.yticks,
+            size=(alloc.width, alloc.height), margins=(self.marginx, self.marginy),
+            offsets=(self.fontsize * 3 if self.show_yaxis else 0.0, self.fontsize * 2 if self.show_xaxis else 0.0)
+        )
 
     def on_realize(self, widget):
         self.get_style_context().add_class('gtkdm')
@@ -2445,170 +4561,259 @@ class XYScatter(Gtk.DrawingArea):
                 m = re.match('^\s*([^\s,|;]+)[\s,|;]*([^\s,|;]+)\s*$', getattr(self, 'plot{}'.format(i), ''))
                 if m:
                     xname, yname = m.groups()
-                    pair = ChartPair(xname, yname, self.buffer, update=1 / self.sample)
+                    pair = ChartPair(
+                        xname, yname, self.buffer, update=1 / self.sample, tolerance=self.tolerance, owner=self
+                    )
                     pair.connect('changed', self.on_values_changed)
                     self.plots.append(pair)
 
     def on_values_changed(self, pair):
-        self.props.ymin = min(pair.data[:, 1].min(), self.ymin)
-        self.props.ymax = max(pair.data[:, 1].max(), self.ymax)
-        self.props.ystep = 10**numpy.int(numpy.log10(self.ymax))
-
-        self.calculate_parameters()
-        self.queue_draw()
-
-    def do_draw(self, cr):
-        if self.color_bg:
-            cr.set_source_rgba(*self.color_bg)
-            cr.paint()
-
-        if self.color_fg:
-            cr.set_source_rgba(*self.color_fg)
-        else:
-            style = self.get_style_context()
-            color = style.get_color(style.get_state())
-            cr.set_source_rgba(*color)
-
-        # draw axes
-        cr.set_line_width(0.75)
-        cr.set_font_size(self.fontsize)
+        yvalues = pair.data[:, 1]
+        if not numpy.isnan(yvalues).all():
+            ymin, ymax = AxisEngine.autoscale(self.ymin, self.ymax, numpy.nanmin(yvalues), numpy.nanmax(yvalues))
+            if (ymin, ymax) != (self.ymin, self.ymax):
+                self.freeze_notify()
+                self.props.ymin = ymin
+                self.props.ymax = ymax
+                self.props.ystep = AxisEngine.step(ymin, ymax)
+                self.thaw_notify()
+        self.redraw()
+
+    def snapshot(self, copy=False):
+        """
+        Collect the layout and data needed to render a frame
+        :param copy: whether to copy the data so that it can be rendered on another thread
+        """
+        color = self.color_fg or self.get_theme()['foreground']
         alloc = self.get_allocation()
-        if not self.params or (alloc.width, alloc.height) != (self.params['alloc'].width, self.params['alloc'].height):
-            self.calculate_parameters()
+        frame = {
+            'time': time.monotonic(),
+            'size': (alloc.width, alloc.height),
+            'scale': self.get_scale_factor(),
+            'params': self.params,
+            'background': tuple(self.color_bg) if self.color_bg else None,
+            'color': tuple(color),
+            'fontsize': self.fontsize,
+            'digits': self.digits,
+            'axes': (self.show_xaxis, self.show_yaxis),
+            'palette': [tuple(self.palette(i)) for i in range(len(self.plots))],
+            'traces': self.frame_buffer() if copy else self.traces,
+            'buffer': self.buffer,
+            'plots': [],
+        }
+        for plot in self.plots:
+            if plot.array_mode:
+                frame['plots'].append((True, [(0, plot.data.copy() if copy else plot.data)]))
+            else:
+                segments = [(offset, points.copy() if copy else points) for offset, points in plot.segments()]
+                frame['plots'].append((False, segments))
+        return frame
 
-        if self.show_xaxis:
-            xframe = self.params['converter'].xy(
-                [
-                    (self.params['xmin'], self.params['ymin']),
-                    (self.params['xmax'], self.params['ymin']),
-                    (self.params['xmin'], self.params['ymax']),
-                    (self.params['xmax'], self.params['ymax'])
-                ],
-                yoff=5
-            )
-            cr.move_to(*xframe[0])
-            cr.line_to(*xframe[1])
-            cr.stroke()
+    def render(self, cr, frame):
+        """
+        Render a frame collected by snapshot()
+        """
+        if frame['background']:
+            cr.set_source_rgba(*frame['background'])
+            cr.paint()
 
-            major = self.params['converter'].xy(self.params['xmajor'], yoff=5)
-            for i, tick in enumerate(major):
-                vtick = self.params['xmajor'][i]
-                cr.move_to(tick[0], tick[1])
-                cr.line_to(tick[0], tick[1] + 5)
+        # axes are rendered once to a cached layer and traces drawn on top
+        layer = AxisEngine.layer(
+            frame['params'], frame['scale'], frame['color'], frame['fontsize'], frame['digits'], *frame['axes']
+        )
+        cr.set_source_surface(layer, 0, 0)
+        cr.paint()
+
+        converter = frame['params']['converter']
+        palette = frame['palette']
+        resolution = 1.0 / frame['scale']
+        for i, (array_mode, segments) in enumerate(frame['plots']):
+            if array_mode:
+                data = segments[0][1]
+                if utils.is_monotonic(data[:, 0]):
+                    pos = converter.trace(data[:, 0], data[:, 1], frame['traces'], resolution)
+                else:
+                    pos = converter.xy(data)
+                    pos = utils.thin_points(pos[~numpy.isnan(pos).any(axis=1)], resolution)
+                if not len(pos):
+                    continue
+                cr.set_line_width(0.75)
+                cr.set_source_rgba(*palette[i])
+                cr.move_to(*pos[0])
+                for mark in pos[1:]:
+                    cr.line_to(*mark)
                 cr.stroke()
-                text = ('{{:0.{}g}}'.format(self.digits)).format(vtick[0])
-                xb, yb, w, h = cr.text_extents(text)[:4]
-                cr.move_to(tick[0] - xb - w / 2, tick[1] + 7 - yb)
-                cr.show_text(text)
-
-            if self.xticks:
-                minor = self.params['converter'].xy(self.params['xminor'], yoff=5)
-                for tick in minor:
-                    cr.move_to(tick[0], tick[1])
-                    cr.line_to(tick[0], tick[1] + 3)
-                    cr.stroke()
-
-        if self.show_yaxis:
-            yframe = self.params['converter'].xy(
-                [
-                    (self.params['xmin'], self.params['ymin']),
-                    (self.params['xmin'], self.params['ymax']),
-                    (self.params['xmax'], self.params['ymin']),
-                    (self.params['xmax'], self.params['ymax'])
-                ],
-                xoff=-5
-            )
-
-            cr.move_to(*yframe[0])
-            cr.line_to(*yframe[1])
-            cr.stroke()
-
-            major = self.params['converter'].xy(self.params['ymajor'], xoff=-5)
-            for i, tick in enumerate(major):
-                vtick = self.params['ymajor'][i]
-                cr.move_to(tick[0], tick[1])
-                cr.line_to(tick[0] - 5, tick[1])
+                for mark in pos:
+                    cr.new_sub_path()
+                    cr.arc(*mark, 0.5, 0, 2 * pi)
+                cr.fill_preserve()
                 cr.stroke()
-                text = ('{{:0.{}g}}'.format(self.digits)).format(vtick[1])
-                xb, yb, w, h = cr.text_extents(text)[:4]
-                cr.move_to(tick[0] - 7 - w - xb, tick[1] - yb - h / 2)
-                cr.show_text(text)
-
-            if self.yticks:
-                minor = self.params['converter'].xy(self.params['yminor'], xoff=-5)
-                for tick in minor:
-                    cr.move_to(tick[0], tick[1])
-                    cr.line_to(tick[0] - 2, tick[1])
-                    cr.stroke()
-
-        if not self.plots:
-            return
-
-        for i, plot in enumerate(self.plots):
-            pos = self.params['converter'].xy(plot.data)
-            if plot.array_mode:
-                cr.set_line_width(0.75)
-                cr.set_source_rgba(*self.palette(i))
-                for j, mark in enumerate(pos):
-                    if j == 0:
-                        cr.arc(*mark, 0.5, 0, 2 * pi)
-                        cr.fill_preserve()
-                        cr.stroke()
-                        cr.move_to(*mark)
-                        continue
-                    else:
-                        cr.save()
+            else:
+                cr.set_line_width(1.0)
+                for offset, points in segments:
+                    for j, mark in enumerate(converter.xy(points), offset):
+                        if numpy.isnan(mark).any():
+                            continue
+                        cr.set_source_rgba(*palette[i][:3], (j + 1.) / (frame['buffer'] + 1.))
                         cr.arc(*mark, 0.5, 0, 2 * pi)
                         cr.fill_preserve()
                         cr.stroke()
-                        cr.restore()
-                        cr.line_to(*mark)
-                cr.stroke()
-            else:
-                cr.set_line_width(1.0)
-                for j, mark in enumerate(pos):
-                    cr.set_source_rgba(*alpha(self.palette(i), (j + 1.) / (self.buffer + 1.)))
-                    cr.arc(*mark, 0.5, 0, 2 * pi)
-                    cr.fill_preserve()
-                    cr.stroke()
+
+    def do_draw(self, cr):
+        self.calculate_parameters()
+        if self.threaded and not EDITOR:
+            self.draw_offscreen(cr)
+        else:
+            self.render(cr, self.snapshot())
 
 
 class StripData(GObject.GObject):
+    """
+    Time-binned history of several process variables, driven by channel monitors. Each update is placed in the
+    display bin of its process variable timestamp, keeping the range of values seen during the bin, and quiet
+    channels hold their last value into subsequent bins. Bins are closed on the local clock, so timestamps are
+    clamped to the open bin and the current time, late updates landing in the open bin and updates from IOCs with
+    clocks running ahead not closing bins early.
+    """
     __gsignals__ = {
         'changed': (GObject.SIGNAL_RUN_FIRST, None, [])
     }
 
-    def __init__(self, names, period=60.0, sample_freq=1, refresh_freq=1):
+    def __init__(self, names, period=60.0, sample_freq=1, refresh_freq=1, persist=False, owner=None):
         super().__init__()
         self.size = int(period * sample_freq)
         self.count = len(names)
-        self.ydata = numpy.zeros((self.size, self.count))
-        self.xdata = numpy.linspace(-period, 0, self.size)
-        self.ydata.fill(numpy.nan)
-        self.pvs = [
-            gepics.PV(name) for name in names
-        ]
-        self.sample_time = 1000. / sample_freq
-        self.refresh_time = 1000. / refresh_freq
-        GLib.timeout_add(self.sample_time, self.sample_data)
-        GLib.timeout_add(self.refresh_time, self.refresh)
-
-    def sample_data(self):
-        self.ydata[:-1] = self.ydata[1:]
-        for i, pv in enumerate(self.pvs):
-            self.ydata[-1, i] = numpy.nan if not pv.is_active() else pv.get()
-        return True
+        self.interval = 1. / sample_freq
+        self.history = utils.HistoryPyramid(self.size, self.count)
+
+        # current value of each channel, last value of each channel and the statistics of the open bin
+        self.values = [None] * self.count
+        self.held = numpy.full(self.count, numpy.nan)
+        self.minimum = numpy.empty(self.count)
+        self.maximum = numpy.empty(self.count)
+        self.total = numpy.empty(self.count)
+        self.samples = numpy.empty(self.count)
+        self.start = numpy.floor(time.time() / self.interval) * self.interval
+        self.open_bin()
+
+        self.pvs = []
+        for i, name in enumerate(names):
+            pv = Channels.open(owner, name)
+            pv.connect('changed', self.on_change, i)
+            pv.connect('time', self.on_time, i)
+            pv.connect('active', self.on_active, i)
+            self.pvs.append(pv)
+
+        self.stores = []
+        if persist:
+            self.stores = [utils.ChannelHistory.open(name, interval=self.interval) for name in names]
+            self.load_history()
+        Clock.subscribe(1. / refresh_freq, self.refresh, owner=owner)
+        if owner is not None:
+            owner.connect('destroy', self.close)
+
+    def on_change(self, pv, value, index):
+        # the value is recorded once its timestamp arrives, which is always emitted right after it
+        self.values[index] = value
+
+    def on_time(self, pv, stamp, index):
+        try:
+            value = float(self.values[index])
+        except (TypeError, ValueError):
+            value = numpy.nan
+        self.record(index, stamp.timestamp(), value)
+
+    def on_active(self, pv, state, index):
+        if not state:
+            self.held[index] = numpy.nan
+
+    def record(self, index, timestamp, value):
+        """
+        Add an update of one channel to the display bin of its timestamp
+        :param index: channel index
+        :param timestamp: time of the update in seconds since the epoch
+        :param value: new value
+        """
+        timestamp = min(max(timestamp, self.start), time.time())
+        self.advance(timestamp)
+        self.held[index] = value
+        if not numpy.isnan(value):
+            self.minimum[index] = numpy.fmin(self.minimum[index], value)
+            self.maximum[index] = numpy.fmax(self.maximum[index], value)
+            self.total[index] = numpy.nansum([self.total[index], value])
+            self.samples[index] += 1
+            if self.stores:
+                self.stores[index].append(timestamp, value)
+
+    def open_bin(self):
+        """
+        Start a new display bin from the held channel values
+        """
+        self.minimum[:] = self.held
+        self.maximum[:] = self.held
+        self.total[:] = self.held
+        self.samples[:] = numpy.isfinite(self.held)
+
+    def advance(self, now):
+        """
+        Close all display bins which end at or before the given time. Empty bins hold the last channel values.
+        :param now: time in seconds since the epoch
+        """
+        count = int((now - self.start) // self.interval)
+        if count <= 0:
+            return
+
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            mean = numpy.where(self.samples > 0, self.total / self.samples, numpy.nan)
+        idle = min(count - 1, self.size)
+        self.history.extend(
+            numpy.vstack([mean, numpy.tile(self.held, (idle, 1))]),
+            minimum=numpy.vstack([self.minimum, numpy.tile(self.held, (idle, 1))]),
+            maximum=numpy.vstack([self.maximum, numpy.tile(self.held, (idle, 1))]),
+        )
+        self.start += count * self.interval
+        self.open_bin()
+
+    def load_history(self):
+        """
+        Fill the time window from the persistent channel histories
+        """
+        times = self.start + (numpy.arange(self.size) - self.size) * self.interval
+        tolerance = 2 * max([self.interval] + [store.interval for store in self.stores])
+        samples = numpy.column_stack([store.resample(times, tolerance) for store in self.stores])
+        self.history.extend(samples)
+
+    def xdata(self, level, out=None):
+        """
+        Return the end times in seconds relative to now of the bins of a history level
+        :param level: history level index
+        :param out: optional output array of the level size
+        """
+        out = self.history.xdata(level, out=out)
+        out *= self.interval
+        out += self.start - time.time()
+        return out
 
     def refresh(self):
+        self.advance(time.time())
         self.emit("changed")
         return True
 
+    def close(self, *args):
+        """
+        Write the persistent channel histories to disk
+        """
+        for store in self.stores:
+            store.flush()
 
-class StripPlot(Gtk.DrawingArea):
+
+class StripPlot(ThemeMixin, OffscreenMixin, Gtk.DrawingArea):
     __gtype_name__ = 'StripPlot'
-    period = GObject.Property(type=int, default=60, minimum=5, maximum=1440, nick='Time Window (s)')
+    period = GObject.Property(type=int, default=60, minimum=5, maximum=86400, nick='Time Window (s)')
     refresh = GObject.Property(type=float, default=1, minimum=.1, maximum=10, nick='Redraw Freq (hz)')
-    sample = GObject.Property(type=float, default=1, minimum=.1, maximum=10, nick='Sample Freq (hz)')
+    sample = GObject.Property(type=float, default=1, minimum=.1, maximum=10, nick='Bin Freq (hz)')
+    persist = GObject.Property(type=bool, default=False, nick='Persistent History')
+    threaded = GObject.Property(type=bool, default=False, nick='Threaded Rendering')
 
     color_bg = GObject.Property(type=Gdk.RGBA, nick='Background Color')
     color_fg = GObject.Property(type=Gdk.RGBA, nick='Foreground Color')
@@ -2641,46 +4846,17 @@ class StripPlot(Gtk.DrawingArea):
         self.params = {}
         self.plot = None
         self.palette = None
+        self.positions = numpy.empty(0)
+        self.traces = utils.TraceBuffer()
         self.connect('realize', self.on_realize)
 
     def calculate_parameters(self):
-        self.xmin = - self.period
-        self.xmax = 0.0
-
-        xminimum, xmaximum, xmajor, xminor = tick_points(self.xmin, self.xmax, self.xstep, self.xticks)
-        yminimum, ymaximum, ymajor, yminor = tick_points(self.ymin, self.ymax, self.ystep, self.yticks)
-
-        xmajor_points = list(zip(xmajor, (yminimum,) * len(xmajor)))
-        xminor_points = list(zip(xminor, (yminimum,) * len(xminor)))
-
-        ymajor_points = list(zip((xminimum,) * len(ymajor), ymajor))
-        yminor_points = list(zip((xminimum,) * len(yminor), yminor))
-
         alloc = self.get_allocation()
-
-        yoffset = 0.0 if not self.show_xaxis else self.fontsize * 2
-        xoffset = 0.0 if not self.show_yaxis else self.fontsize * 3
-
-        self.params = {
-            'alloc': alloc,
-            'xmin': xminimum,
-            'xmax': xmaximum,
-            'xmajor': xmajor_points,
-            'xminor': xminor_points,
-            'ymin': yminimum,
-            'ymax': ymaximum,
-            'ymajor': ymajor_points,
-            'yminor': yminor_points,
-            'converter': ChartCoord(
-                xlimits=(xminimum, xmaximum),
-                ylimits=(yminimum, ymaximum),
-                size=(alloc.width, alloc.height),
-                margins=(self.marginx, self.marginy),
-                xoffset=xoffset, yoffset=yoffset
-            )
-        }
-        if self.plot:
-            self.xvalues = self.params['converter'].x(self.plot.xdata)
+        self.params = AxisEngine.layout(
+            (-self.period, 0.0), self.xstep, self.xticks, (self.ymin, self.ymax), self.ystep, self.yticks,
+            size=(alloc.width, alloc.height), margins=(self.marginx, self.marginy),
+            offsets=(self.fontsize * 3 if self.show_yaxis else 0.0, self.fontsize * 2 if self.show_xaxis else 0.0)
+        )
 
     def on_realize(self, widget):
         self.get_style_context().add_class('gtkdm')
@@ -2690,106 +4866,90 @@ class StripPlot(Gtk.DrawingArea):
         xminimum, xmaximum, xmajor, xminor = tick_points(-self.period, 0, self.xstep, self.xticks)
 
         if not EDITOR:
-            self.plot = StripData(list(pv_names), period=-xminimum, sample_freq=self.sample, refresh_freq=self.refresh)
-            self.plot.connect('changed', lambda x: self.queue_draw())
+            self.plot = StripData(
+                list(pv_names), period=-xminimum, sample_freq=self.sample, refresh_freq=self.refresh,
+                persist=self.persist, owner=self
+            )
+            self.plot.connect('changed', lambda x: self.redraw())
 
-    def do_draw(self, cr):
-        if self.color_bg:
-            cr.set_source_rgba(*self.color_bg)
+    def snapshot(self, copy=False):
+        """
+        Collect the layout and data needed to render a frame
+        :param copy: whether to copy the data so that it can be rendered on another thread
+        """
+        alloc = self.get_allocation()
+        scale = self.get_scale_factor()
+        frame = {
+            'time': time.monotonic(),
+            'size': (alloc.width, alloc.height),
+            'scale': scale,
+            'params': self.params,
+            'background': tuple(self.color_bg) if self.color_bg else None,
+            'color': tuple(self.color_fg or self.get_theme()['foreground']),
+            'fontsize': self.fontsize,
+            'digits': self.digits,
+            'axes': (self.show_xaxis, self.show_yaxis),
+            'palette': [],
+            'traces': self.frame_buffer() if copy else self.traces,
+            'count': 0,
+        }
+        if self.plot:
+            # pick the history level with about one bin per pixel
+            level = self.plot.history.select(self.params['converter'].width * scale)
+            size = self.plot.history.levels[level].size
+            if len(self.positions) != size:
+                self.positions = numpy.empty(size)
+            positions = self.plot.xdata(level, out=self.positions)
+            segments = self.plot.history.levels[level].segments()
+            if copy:
+                positions = positions.copy()
+                segments = [(offset, lo.copy(), hi.copy()) for offset, lo, hi in segments]
+            palette = [tuple(self.palette(j)) for j in range(self.plot.count)]
+            frame.update(count=self.plot.count, positions=positions, segments=segments, palette=palette)
+        return frame
+
+    def render(self, cr, frame):
+        """
+        Render a frame collected by snapshot()
+        """
+        if frame['background']:
+            cr.set_source_rgba(*frame['background'])
             cr.paint()
 
-        if self.color_fg:
-            cr.set_source_rgba(*self.color_fg)
-        else:
-            cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
+        # axes are rendered once to a cached layer and traces drawn on top
+        layer = AxisEngine.layer(
+            frame['params'], frame['scale'], frame['color'], frame['fontsize'], frame['digits'], *frame['axes']
+        )
+        cr.set_source_surface(layer, 0, 0)
+        cr.paint()
 
-        # draw axes
+        cr.save()
         cr.set_line_width(0.75)
-        cr.set_font_size(self.fontsize)
-        alloc = self.get_allocation()
-        if not self.params or (alloc.width, alloc.height) != (self.params['alloc'].width, self.params['alloc'].height):
-            self.calculate_parameters()
-
-        if self.show_xaxis:
-            xframe = self.params['converter'].xy(
-                [
-                    (self.params['xmin'], self.params['ymin']),
-                    (self.params['xmax'], self.params['ymin']),
-                    (self.params['xmin'], self.params['ymax']),
-                    (self.params['xmax'], self.params['ymax'])
-                ],
-                yoff=5
-            )
-            cr.move_to(*xframe[0])
-            cr.line_to(*xframe[1])
-            cr.stroke()
-            # if self.show_yaxis:
-            #     cr.move_to(*xframe[2])
-            #     cr.line_to(*xframe[3])
-            #     cr.stroke()
-
-            major = self.params['converter'].xy(self.params['xmajor'], yoff=5)
-            for i, tick in enumerate(major):
-                vtick = self.params['xmajor'][i]
-                cr.move_to(tick[0], tick[1])
-                cr.line_to(tick[0], tick[1] + 5)
-                cr.stroke()
-                text = ('{{:0.{}g}}'.format(self.digits)).format(vtick[0])
-                xb, yb, w, h = cr.text_extents(text)[:4]
-                cr.move_to(tick[0] - xb - w / 2, tick[1] + 7 - yb)
-                cr.show_text(text)
-
-            if self.xticks:
-                minor = self.params['converter'].xy(self.params['xminor'], yoff=5)
-                for tick in minor:
-                    cr.move_to(tick[0], tick[1])
-                    cr.line_to(tick[0], tick[1] + 3)
-                    cr.stroke()
-
-        if self.show_yaxis:
-            yframe = self.params['converter'].xy(
-                [
-                    (self.params['xmin'], self.params['ymin']),
-                    (self.params['xmin'], self.params['ymax']),
-                    (self.params['xmax'], self.params['ymin']),
-                    (self.params['xmax'], self.params['ymax'])
-                ],
-                xoff=-5
-            )
-
-            cr.move_to(*yframe[0])
-            cr.line_to(*yframe[1])
+        converter = frame['params']['converter']
+        resolution = 1.0 / frame['scale']
+        # the oldest bins of the level may begin before the time window
+        cr.rectangle(converter.orgx, converter.orgy - converter.height, converter.width, converter.height)
+        cr.clip()
+        for j in range(frame['count']):
+            cr.set_source_rgba(*frame['palette'][j])
+            started = False
+            for offset, lo, hi in frame['segments']:
+                # bins are drawn as the envelope of the values seen during each bin
+                points = converter.trace(
+                    frame['positions'][offset:offset + len(lo)], lo[:, j], frame['traces'], resolution, upper=hi[:, j]
+                )
+                for x, y in points:
+                    if not started:
+                        cr.move_to(x, y)
+                        started = True
+                        continue
+                    cr.line_to(x, y)
             cr.stroke()
+        cr.restore()
 
-            major = self.params['converter'].xy(self.params['ymajor'], xoff=-5)
-            for i, tick in enumerate(major):
-                vtick = self.params['ymajor'][i]
-                cr.move_to(tick[0], tick[1])
-                cr.line_to(tick[0] - 5, tick[1])
-                cr.stroke()
-                text = ('{{:0.{}g}}'.format(self.digits)).format(vtick[1])
-                xb, yb, w, h = cr.text_extents(text)[:4]
-                cr.move_to(tick[0] - 7 - w - xb, tick[1] - yb - h / 2)
-                cr.show_text(text)
-
-            if self.yticks:
-                minor = self.params['converter'].xy(self.params['yminor'], xoff=-5)
-                for tick in minor:
-                    cr.move_to(tick[0], tick[1])
-                    cr.line_to(tick[0] - 2, tick[1])
-                    cr.stroke()
-
-        if not self.plot:
-            return
-
-        cr.set_line_width(0.75)
-        for j in range(self.plot.count):
-            sel = numpy.logical_not(numpy.isnan(self.plot.ydata[:, j]))
-            yvalues = self.params['converter'].y(self.plot.ydata[sel, j])
-            cr.set_source_rgba(*self.palette(j))
-            for i, (x, y) in enumerate(zip(self.xvalues[sel], yvalues)):
-                if i == 0:
-                    cr.move_to(x, y)
-                    continue
-                cr.line_to(x, y)
-            cr.stroke()
+    def do_draw(self, cr):
+        self.calculate_parameters()
+        if self.threaded and not EDITOR:
+            self.draw_offscreen(cr)
+        else:
+            self.render(cr, self.snapshot())
@@ -33,6 +33,7 @@ setup(
         'bin/gtkdm',
         'bin/gtkdm-editor',
         'bin/gtkdm-mksym',
+        'bin/gtkdm-compile',
     ],
     classifiers=[
         'Intended Audience :: Developers',